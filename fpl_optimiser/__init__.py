@@ -1,3 +1,8 @@
-from .data import FplAPIData, FplXPtsForecastData
+from .data import FplAPIData, FplXPtsForecastData, FplSnapshotLog, PlayerPool
 from .optimiser import MILPOptimiser
-from .optimiser import MILPActualsOptimiser
\ No newline at end of file
+from .optimiser import MILPActualsOptimiser
+from .optimiser import MILPBatchOptimiser
+from .optimiser import MILPChipPlanner
+from .optimiser import SquadSimulator
+from .optimiser import MILPHindsightOracle
+from .optimiser import MILPPortfolioSolver
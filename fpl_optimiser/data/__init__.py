@@ -1 +1,3 @@
-from .data import FplAPIData, FplXPtsForecastData
\ No newline at end of file
+from .data import FplAPIData, FplXPtsForecastData
+from .player_pool import PlayerPool
+from .snapshots import FplSnapshotLog
\ No newline at end of file
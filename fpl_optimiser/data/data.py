@@ -5,6 +5,7 @@ import numpy as np
 
 from ..utils import YAMLFile, DATA_DIR
 from .enrichment import *
+from .snapshots import FplSnapshotLog
 
 class FplAPIData:
     """
@@ -18,6 +19,7 @@ class FplAPIData:
         self.team_used_gw_df = None
         self.directory = os.path.join(DATA_DIR, "official_api_data")
         self.auth_cookie = {"Cookie": self.config.fpl_api_cookie_auth}
+        self.snapshot_log = FplSnapshotLog(self.season_label)
     def get_gw_team_lineup_data(self, gameweek: int, save_to_disk: bool = True) -> pd.DataFrame:
         """
         Generates a pd.DataFrame object that represents the team used in the specified (historic) gameweek. 
@@ -61,14 +63,11 @@ class FplAPIData:
 
         return df
     
-    def get_gw_player_data(self, gameweek: int, save_to_disk: bool = True) -> pd.DataFrame:
-        """ 
-        Generates a pd.DataFrame object containing data from the official FPL API for the specified gameweek.
-        Data is cleaned and pre-processed, ready for optimisation.
-        The function provides a default keyword arg "save_to_disk", which saves the current view to the project folder by default.
-        Default is True since API data will change wrt. time so a method call at a future data for a given gameweek will produce different data.
+    def get_raw_player_data(self) -> pd.DataFrame:
         """
-        
+        Generates a pd.DataFrame object containing every field of the current official FPL API player data, uncleaned.
+        """
+
         api_endpoint = f"{self.config.fpl_api_base_url}/bootstrap-static/"
 
         # Retrieve (dict) data from API using requests and JSON
@@ -88,7 +87,25 @@ class FplAPIData:
             
             player_data[field] = all_field_values
 
-        player_data_df = pd.DataFrame(data=player_data, columns=player_data.keys())
+        return pd.DataFrame(data=player_data, columns=player_data.keys())
+
+    def capture_gw_player_data(self, gameweek: int) -> dict:
+        """
+        Captures the current raw official FPL API player data into the snapshot log, storing only the fields that changed
+        since the previous capture. Intended to be called many times per gameweek (e.g. to track price changes).
+        Any capture can be rebuilt with self.snapshot_log.rebuild(gameweek=..., capture_time=...).
+        """
+        return self.snapshot_log.append(self.get_raw_player_data(), gameweek)
+
+    def get_gw_player_data(self, gameweek: int, save_to_disk: bool = True) -> pd.DataFrame:
+        """ 
+        Generates a pd.DataFrame object containing data from the official FPL API for the specified gameweek.
+        Data is cleaned and pre-processed, ready for optimisation.
+        The function provides a default keyword arg "save_to_disk", which saves the current view to the project folder by default.
+        Default is True since API data will change wrt. time so a method call at a future data for a given gameweek will produce different data.
+        """
+
+        player_data_df = self.get_raw_player_data()
         player_data_df["gw"] = gameweek
         
         # Calculate further measures and restrict attention to key columns.
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from typing import Iterable, Optional
+
+class PlayerPool:
+    """
+    Class representing a read-only, array-backed view of player gameweek data.
+    Points, costs and minutes are stored as contiguous (players x gameweeks) NumPy arrays, positions and teams are
+    integer-coded and the members of each position and team group are stored as precomputed index arrays.
+    A pool can be moved to shared memory, after which it is passed to worker processes without copying its arrays.
+    """
+
+    ARRAYS = ["points", "costs", "minutes", "positions", "teams", "position_order", "position_offsets", "team_order", "team_offsets"]
+
+    def __init__(self,
+                 index: Iterable,
+                 gameweeks: Iterable[int],
+                 arrays: dict,
+                 position_labels: list,
+                 team_labels: list,
+                 shm: Optional[shared_memory.SharedMemory] = None,
+                 layout: Optional[list] = None) -> None:
+
+        self.index = pd.Index(index)
+        self.gameweeks = list(gameweeks)
+        self.position_labels = list(position_labels)
+        self.team_labels = list(team_labels)
+        self.shm = shm
+        self.layout = layout
+        for name in self.ARRAYS:
+            array = arrays[name]
+            array.flags.writeable = False
+            setattr(self, name, array)
+
+    @classmethod
+    def from_dataframe(cls,
+                       player_data_df: pd.DataFrame,
+                       gameweeks: Iterable[int],
+                       position_labels: list,
+                       team_labels: list,
+                       points: str = "ep_gw{t}",
+                       costs: str = "now_cost",
+                       minutes: str = "xmins",
+                       positions: str = "position",
+                       teams: str = "team") -> "PlayerPool":
+        """
+        Creates a PlayerPool from a player gameweek DataFrame. Column names containing "{t}" are read for each gameweek,
+        other columns are static and repeated across gameweeks. Rows follow the DataFrame index.
+        """
+        gameweeks = list(gameweeks)
+        columns = lambda column: [column.format(t=t) for t in gameweeks]
+        numeric = lambda column: np.ascontiguousarray(player_data_df[columns(column)].to_numpy(dtype=np.float64))
+        codes = lambda column, labels: np.ascontiguousarray(np.stack([pd.Categorical(player_data_df[col], categories=labels).codes.astype(np.int8) for col in columns(column)], axis=1))
+
+        arrays = {"points": numeric(points), "costs": numeric(costs), "minutes": numeric(minutes),
+                  "positions": codes(positions, position_labels), "teams": codes(teams, team_labels)}
+        arrays["position_order"], arrays["position_offsets"] = cls.group_index_arrays(arrays["positions"], len(position_labels))
+        arrays["team_order"], arrays["team_offsets"] = cls.group_index_arrays(arrays["teams"], len(team_labels))
+        return cls(player_data_df.index, gameweeks, arrays, position_labels, team_labels)
+
+    @staticmethod
+    def group_index_arrays(codes: np.ndarray, num_groups: int) -> tuple:
+        """
+        Sorts players by group code for each gameweek. Members of group k in gameweek column j are
+        order[j, offsets[j, k]:offsets[j, k + 1]], players with an unknown code (-1) belong to no group.
+        """
+        order = np.ascontiguousarray(np.argsort(codes, axis=0, kind="stable").T.astype(np.int32))
+        sorted_codes = np.take_along_axis(codes.T, order, axis=1)
+        offsets = np.stack([np.searchsorted(row, np.arange(num_groups + 1)) for row in sorted_codes]).astype(np.int32)
+        return order, offsets
+
+    def take(self, rows: np.ndarray) -> "PlayerPool":
+        """Returns a pool holding only the given rows (e.g. a pruned player pool), with the group index arrays rebuilt."""
+        arrays = {name: np.ascontiguousarray(getattr(self, name)[rows]) for name in ["points", "costs", "minutes", "positions", "teams"]}
+        arrays["position_order"], arrays["position_offsets"] = self.group_index_arrays(arrays["positions"], len(self.position_labels))
+        arrays["team_order"], arrays["team_offsets"] = self.group_index_arrays(arrays["teams"], len(self.team_labels))
+        return PlayerPool(self.index[rows], self.gameweeks, arrays, self.position_labels, self.team_labels)
+
+    def column(self, gameweek: int) -> int:
+        """Returns the array column holding data for the given gameweek."""
+        return self.gameweeks.index(gameweek)
+
+    def columns(self, gameweeks: Iterable[int]) -> list:
+        """Returns the array columns holding data for the given gameweeks."""
+        return [self.column(t) for t in gameweeks]
+
+    def position_group(self, position: str, gameweek: int) -> np.ndarray:
+        """Returns the row positions of players in the given position for the given gameweek."""
+        j, k = self.column(gameweek), self.position_labels.index(position)
+        return self.position_order[j, self.position_offsets[j, k]:self.position_offsets[j, k + 1]]
+
+    def team_group(self, team: str, gameweek: int) -> np.ndarray:
+        """Returns the row positions of players in the given team for the given gameweek."""
+        j, k = self.column(gameweek), self.team_labels.index(team)
+        return self.team_order[j, self.team_offsets[j, k]:self.team_offsets[j, k + 1]]
+
+    def to_shared_memory(self) -> "PlayerPool":
+        """
+        Copies the arrays into a single shared memory block and returns a pool backed by it. Pickling the returned
+        pool (e.g. when passing it to a worker process) only transfers the block name and array layout.
+        The creating process should call unlink() once all workers are finished.
+        """
+        layout, size = [], 0
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            layout.append((name, array.shape, array.dtype.str, size))
+            size += -(-array.nbytes // 8) * 8  # Keep every array 8-byte aligned.
+
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        arrays = self.attach_arrays(shm, layout)
+        for name in self.ARRAYS:
+            arrays[name][...] = getattr(self, name)
+
+        return PlayerPool(self.index, self.gameweeks, arrays, self.position_labels, self.team_labels, shm=shm, layout=layout)
+
+    @staticmethod
+    def attach_arrays(shm: shared_memory.SharedMemory, layout: list) -> dict:
+        """Creates NumPy views onto a shared memory block for the given array layout."""
+        return {name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset) for name, shape, dtype, offset in layout}
+
+    @classmethod
+    def from_shared_memory(cls, name: str, layout: list, index: pd.Index, gameweeks: list, position_labels: list, team_labels: list) -> "PlayerPool":
+        """Attaches to a pool previously placed in shared memory by to_shared_memory()."""
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(index, gameweeks, cls.attach_arrays(shm, layout), position_labels, team_labels, shm=shm, layout=layout)
+
+    def __reduce__(self):
+        if self.shm is None:
+            return (PlayerPool, (self.index, self.gameweeks, {name: getattr(self, name) for name in self.ARRAYS}, self.position_labels, self.team_labels))
+        return (PlayerPool.from_shared_memory, (self.shm.name, self.layout, self.index, self.gameweeks, self.position_labels, self.team_labels))
+
+    def close(self) -> None:
+        """Releases this process' views onto the shared memory block."""
+        if self.shm is not None:
+            for name in self.ARRAYS:
+                setattr(self, name, None)
+            self.shm.close()
+
+    def unlink(self) -> None:
+        """Closes and frees the shared memory block, to be called by the process that created it."""
+        if self.shm is not None:
+            shm = self.shm
+            self.close()
+            shm.unlink()
+            self.shm = None
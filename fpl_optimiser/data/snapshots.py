@@ -0,0 +1,134 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+from ..utils import DATA_DIR
+
+class FplSnapshotLog:
+    """
+    Class representing an append-only log of official FPL API player data captures.
+    Each capture stores only the fields that changed per player since the previous capture, with a full checkpoint
+    every `checkpoint_interval` captures. A separate index holds the byte offset of every capture so that any
+    gameweek or capture time is rebuilt by replaying the deltas from the nearest checkpoint only.
+    """
+
+    def __init__(self, season_label: str, directory: Optional[str] = None, checkpoint_interval: int = 24, key: str = "id") -> None:
+        self.season_label = season_label
+        self.directory = directory or os.path.join(DATA_DIR, "official_api_data", "snapshots")
+        self.checkpoint_interval = checkpoint_interval
+        self.key = key
+        self.log_filepath = os.path.join(self.directory, f"FPL {season_label} season - snapshot log.jsonl")
+        self.index_filepath = os.path.join(self.directory, f"FPL {season_label} season - snapshot index.jsonl")
+        self.latest_df = None  # Cached state of the most recent capture, used to compute the next delta.
+
+    @staticmethod
+    def to_json(record: dict) -> bytes:
+        """Serialises a log record as a single line of JSON, converting NumPy scalars to Python types."""
+        return (json.dumps(record, separators=(",", ":"), default=lambda value: value.item() if isinstance(value, np.generic) else str(value)) + "\n").encode("utf-8")
+
+    def read_index(self) -> pd.DataFrame:
+        """Reads the capture index, one row per capture in the order they were appended."""
+        if not os.path.exists(self.index_filepath):
+            return pd.DataFrame(columns=["capture_time", "gameweek", "type", "offset"])
+
+        with open(self.index_filepath, "r") as file:
+            return pd.DataFrame([json.loads(line) for line in file])
+
+    def append(self, player_data_df: pd.DataFrame, gameweek: int, capture_time: Optional[str] = None) -> dict:
+        """
+        Appends a capture of the given player data to the log, as a checkpoint or as the fields that changed per player.
+        Returns the index entry of the new capture.
+        """
+        if self.key not in player_data_df.columns:
+            raise ValueError(f"Error: Player data must contain the key column '{self.key}'!")
+
+        capture_time = capture_time or pd.Timestamp.now(tz="UTC").isoformat()
+        index_df = self.read_index()
+        checkpoints = np.flatnonzero(index_df["type"] == "checkpoint")
+        captures_since_checkpoint = len(index_df) - checkpoints[-1] if len(checkpoints) else None
+        if self.latest_df is None and len(index_df):
+            self.latest_df = self.rebuild()
+
+        record = {"capture_time": capture_time, "gameweek": int(gameweek)}
+        columns = list(player_data_df.columns)
+        if captures_since_checkpoint is None or captures_since_checkpoint >= self.checkpoint_interval:
+            record.update({"type": "checkpoint", "columns": columns, "rows": player_data_df.astype(object).to_numpy().tolist()})
+        else:
+            record.update({"type": "delta", **self.compute_delta(self.latest_df, player_data_df)})
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.log_filepath, "ab") as file:
+            offset = file.tell()
+            file.write(self.to_json(record))
+
+        entry = {"capture_time": capture_time, "gameweek": int(gameweek), "type": record["type"], "offset": offset}
+        with open(self.index_filepath, "ab") as file:
+            file.write(self.to_json(entry))
+
+        self.latest_df = player_data_df.reset_index(drop=True)
+        return entry
+
+    def compute_delta(self, previous_df: pd.DataFrame, player_data_df: pd.DataFrame) -> dict:
+        """
+        Computes the changes between two captures: the fields that changed for existing players (keyed by player id),
+        the full rows of added players and the ids of removed players. Column changes are recorded when present.
+        """
+        previous = previous_df.set_index(self.key, drop=False)
+        current = player_data_df.set_index(self.key, drop=False)
+        common = current.index[current.index.isin(previous.index)]
+        delta = {}
+        if list(previous_df.columns) != list(player_data_df.columns):
+            delta["columns"] = list(player_data_df.columns)
+
+        # Vectorised comparison of every field, treating missing values as equal and new columns as changed.
+        current_values = current.loc[common].astype(object)
+        previous_values = previous.loc[common].reindex(columns=current.columns).astype(object)
+        changed = ~((current_values == previous_values) | (current_values.isna() & previous_values.isna())).to_numpy()
+        changed[:, ~current.columns.isin(previous.columns)] = True
+
+        values = current_values.to_numpy()
+        rows = np.flatnonzero(changed.any(axis=1))
+        delta["changed"] = [[common[row], {current.columns[col]: values[row, col] for col in np.flatnonzero(changed[row])}] for row in rows]
+        delta["added"] = current[~current.index.isin(previous.index)].astype(object).to_numpy().tolist()
+        delta["removed"] = previous.index[~previous.index.isin(current.index)].tolist()
+        return delta
+
+    def rebuild(self, gameweek: Optional[int] = None, capture_time: Optional[str] = None) -> pd.DataFrame:
+        """
+        Rebuilds the player data as captured at the given time (the latest capture at or before it), the latest capture
+        for the given gameweek or, if neither is given, the latest capture overall.
+        """
+        index_df = self.read_index()
+        candidates = pd.Series(True, index=index_df.index)
+        if gameweek is not None:
+            candidates &= index_df["gameweek"] == gameweek
+        if capture_time is not None:
+            capture_time = pd.Timestamp(capture_time)
+            capture_time = capture_time.tz_localize("UTC") if capture_time.tz is None else capture_time
+            candidates &= pd.to_datetime(index_df["capture_time"], utc=True) <= capture_time
+        if not candidates.any():
+            raise ValueError(f"Error: No captures found in {self.log_filepath} for gameweek={gameweek}, capture_time={capture_time}!")
+
+        # Replay the deltas from the nearest checkpoint at or before the target capture.
+        target = index_df.index[candidates][-1]
+        checkpoint = index_df.index[(index_df.index <= target) & (index_df["type"] == "checkpoint")][-1]
+        with open(self.log_filepath, "rb") as file:
+            file.seek(int(index_df.at[checkpoint, "offset"]))
+            records = [json.loads(file.readline()) for _ in range(target - checkpoint + 1)]
+
+        columns = records[0]["columns"]
+        key_position = columns.index(self.key)
+        state = {row[key_position]: dict(zip(columns, row)) for row in records[0]["rows"]}
+        for record in records[1:]:
+            columns = record.get("columns", columns)
+            key_position = columns.index(self.key)
+            for player_id in record["removed"]:
+                state.pop(player_id, None)
+            for player_id, fields in record["changed"]:
+                state[player_id].update(fields)
+            for row in record["added"]:
+                state[row[key_position]] = dict(zip(columns, row))
+
+        return pd.DataFrame(list(state.values()), columns=columns)
@@ -1,2 +1,7 @@
 from .optimiser import MILPOptimiser
-from .optimiser_actuals import MILPActualsOptimiser
\ No newline at end of file
+from .optimiser_actuals import MILPActualsOptimiser
+from .batch import MILPBatchOptimiser
+from .chips import MILPChipPlanner
+from .simulation import SquadSimulator
+from .oracle import MILPHindsightOracle
+from .portfolio import MILPPortfolioSolver
@@ -0,0 +1,111 @@
+import pandas as pd
+import pulp
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from .optimiser import MILPOptimiser
+from .workers import initialise_worker, worker_state
+
+def _solve_existing_team(manager, existing_team_df: pd.DataFrame) -> tuple:
+    """
+    Solves the model template for a single existing team, returning the summary row and results DataFrame.
+    Teams failing MILPOptimiser.screen_existing_team (e.g. picks missing from the player data) are reported, not solved.
+    """
+    start_time = time.time()
+    template = worker_state()
+    template.set_existing_team(existing_team_df)
+    issues = template.screen_existing_team()
+    if issues:
+        summary = {"manager": manager, "status": "Screened Out", "objective": None, "solve_time": time.time() - start_time, "issues": " ".join(issues)}
+        return summary, pd.DataFrame({"manager": []})
+
+    constraints = template.add_existing_team_constraints()
+    template.warm_start_existing_team()
+    try:
+        template.solve(pulp.PULP_CBC_CMD(msg=False, warmStart=True))
+        status = pulp.LpStatus[template.prob.status]
+        if template.prob.status == pulp.LpStatusOptimal:
+            template.extract_results()
+            results_df = template.results_df.assign(manager=manager)
+        else:
+            results_df = pd.DataFrame({"manager": []})
+    finally:
+        template.remove_constraints(constraints)
+
+    summary = {"manager": manager, "status": status, "objective": pulp.value(template.prob.objective),
+               "solve_time": time.time() - start_time, "issues": None}
+    return summary, results_df
+
+
+class MILPBatchOptimiser:
+    """
+    Class optimising the existing teams of many managers over the same gameweek interval in one run.
+    The model template is built once, only the existing team equality constraints and warm start change between teams,
+    and the teams are spread across a pool of worker processes.
+    """
+
+    def __init__(self,
+                 player_data_df: pd.DataFrame,
+                 start_gameweek: int,
+                 existing_teams: dict,
+                 processes: Optional[int] = None,
+                 **optimiser_kwargs) -> None:
+
+        # Existing teams map a manager identifier to a DataFrame of picks in the format returned by
+        # FplAPIData.get_gw_team_lineup_data for the gameweek prior to start_gameweek.
+        if not existing_teams:
+            raise ValueError("Error: At least one existing team must be provided!")
+
+        self.player_data_df = player_data_df
+        self.start_gameweek = start_gameweek
+        self.existing_teams = existing_teams
+        self.processes = processes
+        self.optimiser_kwargs = optimiser_kwargs
+        self.results_df = None
+        self.summary_df = None
+        self.throughput = None
+
+    def build_template(self) -> MILPOptimiser:
+        """Builds the model shared by all teams, without any existing team equality constraints."""
+        template = MILPOptimiser(self.player_data_df,
+                                 start_gameweek=self.start_gameweek,
+                                 validation=False,
+                                 use_existing_team=True,
+                                 existing_team_df=next(iter(self.existing_teams.values())),
+                                 **self.optimiser_kwargs)
+        template.initialise_optimisation()
+        template.add_constraints()
+        template.remove_constraints(template.existing_team_constraints)
+        return template
+
+    def calculate_optimal_teams(self) -> pd.DataFrame:
+        """
+        Calculates the optimal transfers and team selection for every existing team. Returns a combined results DataFrame,
+        with a manager column, and sets a summary DataFrame holding each team's solver status, objective and solve time.
+        Teams failing the existing team screen are not solved, their summary holds a Screened Out status and the issues found.
+        """
+        start_time = time.time()
+        print(f"Calculating optimal teams for {len(self.existing_teams)} managers, starting from GW: {self.start_gameweek}...")
+        template = self.build_template()
+
+        if self.processes == 1:
+            initialise_worker(template)
+            outputs = [_solve_existing_team(manager, team_df) for manager, team_df in self.existing_teams.items()]
+        else:
+            with ProcessPoolExecutor(max_workers=self.processes, initializer=initialise_worker, initargs=(template,)) as executor:
+                outputs = list(executor.map(_solve_existing_team, self.existing_teams.keys(), self.existing_teams.values()))
+
+        self.summary_df = pd.DataFrame([summary for summary, _ in outputs])
+        self.results_df = pd.concat([results_df for _, results_df in outputs], axis=0)
+        self.results_df = self.results_df[["manager"] + [col for col in self.results_df.columns if col != "manager"]]
+
+        screened_out = self.summary_df["status"] == "Screened Out"
+        if screened_out.any():
+            print(f"Screened out {screened_out.sum()} teams: {', '.join(map(str, self.summary_df.loc[screened_out, 'manager']))} (see summary_df issues)")
+
+        time_taken = time.time() - start_time
+        self.throughput = 60 * len(self.existing_teams) / time_taken
+        print("Optimisation process complete!")
+        print(f"Time taken: {round(time_taken, 2)} seconds ({round(self.throughput, 2)} teams/minute)")
+        return self.results_df
@@ -0,0 +1,208 @@
+import itertools
+import os
+import subprocess
+import tempfile
+import numpy as np
+import pandas as pd
+import pulp
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from .optimiser import MILPOptimiser
+from .workers import initialise_worker, worker_state
+
+
+class _PlacementRelaxation:
+    """
+    LP relaxation of the shared model, written to MPS once with every chip released. Placements only change the bounds
+    of the chip variables, so each bound is solved by CBC from the written model with the chip bounds rewritten, rather
+    than rewriting the whole model through PuLP, which takes several times as long as the LP solve itself.
+    """
+
+    def __init__(self, model: MILPOptimiser) -> None:
+        model.release_chips()
+        with tempfile.TemporaryDirectory(prefix="fpl-chips-") as tmp_dir:
+            mps_path = os.path.join(tmp_dir, "relaxation.mps")
+            _, variable_names, _, _ = model.prob.writeMPS(mps_path, rename=1)
+            with open(mps_path, "r") as file:
+                lines = file.read().splitlines()
+
+        # The chip bounds are removed from the BOUNDS section, which must close the file, and rewritten for each placement.
+        self.columns = {(chip, t): variable_names[var.name] for chip in model.chips for t, var in model.z_chip[chip].items()}
+        chip_columns = set(self.columns.values())
+        sections = [k for k, line in enumerate(lines) if line and not line[0].isspace() and not line.startswith("*")]
+        if [lines[k].split()[0] for k in sections[-2:]] != ["BOUNDS", "ENDATA"] or sections[-1] != len(lines) - 1:
+            raise RuntimeError("Error: Unexpected MPS layout written by PuLP, expected the BOUNDS section to close the model!")
+        bounds = lines[sections[-2] + 1:-1]
+        removed = [line for line in bounds if line.split()[2] in chip_columns]
+        if len(removed) != len(self.columns):
+            raise RuntimeError(f"Error: Found {len(removed)} MPS bounds for {len(self.columns)} chip variables, expected one each!")
+        self.model_mps = "\n".join(lines[:sections[-2] + 1] + [line for line in bounds if line.split()[2] not in chip_columns])
+        self.constant = model.prob.objective.constant
+        self.path = pulp.PULP_CBC_CMD().path
+
+    def bound(self, placement: dict) -> float:
+        """Returns the LP relaxation bound on the objective of any plan with the given transfer chip placement."""
+        chip_bounds = [f" FX BND       {column}  {int(t == placement[chip])}" if chip in placement else f" BV BND       {column}"
+                       for (chip, t), column in self.columns.items()]
+        with tempfile.TemporaryDirectory(prefix="fpl-chips-") as tmp_dir:
+            mps_path, solution_path = os.path.join(tmp_dir, "placement.mps"), os.path.join(tmp_dir, "placement.sol")
+            with open(mps_path, "w") as file:
+                file.write("\n".join([self.model_mps] + chip_bounds + ["ENDATA", ""]))
+            subprocess.run([self.path, mps_path, "-max", "-initialSolve", "-solution", solution_path],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+            if not os.path.exists(solution_path):
+                raise RuntimeError(f"Error: CBC failed to solve the LP relaxation of placement {placement}!")
+            with open(solution_path, "r") as file:
+                status = file.readline()  # e.g. "Optimal - objective value 454.16144997"
+        if status.startswith("Optimal"):
+            return float(status.split()[-1]) + self.constant
+        if status.startswith("Infeasible"):
+            return -np.inf
+        raise RuntimeError(f"Error: Unexpected CBC status for the LP relaxation of placement {placement}: {status.strip()}!")
+
+
+def _bound_placement(placement: dict) -> float:
+    """Returns the LP relaxation bound on the objective of any plan with the given transfer chip placement."""
+    return worker_state().bound(placement)
+
+
+class MILPChipPlanner:
+    """
+    Class planning the gameweeks in which chips are played over the optimisation horizon.
+    Wildcard and free hit placements change the transfer structure of the model, so every placement of them is bounded
+    by the LP relaxation of a single shared model, written once as only the bounds of the chip variables change between placements.
+    Placements are then solved in order of their bound, with bench boost and triple captain placed by the solver, until
+    no remaining bound can beat the best plan found.
+    """
+
+    def __init__(self,
+                 player_data_df: pd.DataFrame,
+                 start_gameweek: int,
+                 chips: list = MILPOptimiser.CHIPS,
+                 processes: Optional[int] = None,
+                 time_limit: Optional[float] = None,
+                 tolerance: float = 1e-6,
+                 **optimiser_kwargs) -> None:
+
+        self.player_data_df = player_data_df
+        self.start_gameweek = start_gameweek
+        self.chips = list(chips)
+        self.processes = processes  # Worker processes for the LP bounds.
+        self.time_limit = time_limit  # Seconds after which the best plan found so far is returned.
+        self.tolerance = tolerance  # Minimum improvement on the best plan for a placement to be solved.
+        self.optimiser_kwargs = optimiser_kwargs
+        self.optimiser = None
+        self.results_df = None
+        self.placements_df = None
+
+    def build_model(self) -> MILPOptimiser:
+        """Builds the model shared by all chip placements."""
+        optimiser = MILPOptimiser(self.player_data_df, start_gameweek=self.start_gameweek, chips=self.chips, **self.optimiser_kwargs)
+        optimiser.initialise_optimisation()
+        optimiser.add_constraints()
+        return optimiser
+
+    def candidate_placements(self) -> list:
+        """Returns every placement of the transfer chips (a gameweek or None per chip), with at most one chip per gameweek."""
+        transfer_chips = [chip for chip in self.optimiser.TRANSFER_CHIPS if chip in self.chips]
+        options = [[None] + list(self.optimiser.chip_gameweeks(chip)) for chip in transfer_chips]
+        placements = []
+        for gameweeks in itertools.product(*options):
+            played = [t for t in gameweeks if t is not None]
+            if len(set(played)) == len(played):
+                placements.append(dict(zip(transfer_chips, gameweeks)))
+        return placements
+
+    def bound_placements(self, placements: list) -> list:
+        """Returns the LP relaxation bound of each placement, solved across a pool of worker processes."""
+        if len(placements) == 1:
+            return [np.inf]  # A single placement is solved regardless of its bound.
+
+        relaxation = _PlacementRelaxation(self.optimiser)
+        if self.processes == 1:
+            initialise_worker(relaxation)
+            return [_bound_placement(placement) for placement in placements]
+
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=initialise_worker, initargs=(relaxation,)) as executor:
+            return list(executor.map(_bound_placement, placements))
+
+    def solve_placement(self, placement: dict, cutoff: float = -np.inf, time_limit: Optional[float] = None) -> float:
+        """
+        Solves the shared model with the given transfer chip placement for plans scoring at least the cutoff (the best
+        plan so far), so the solver can prune its search against it. Returns the objective value, or -inf if no such plan exists.
+        """
+        self.optimiser.release_chips()
+        self.optimiser.fix_chips(placement)
+        if cutoff > -np.inf:
+            self.optimiser.prob += self.optimiser.prob.objective >= cutoff, "IncumbentCutoff"
+
+        # CBC's feasibility pump dominates the root solve on this model, its diving heuristics find plans far sooner.
+        try:
+            self.optimiser.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, options=["feas off"]))
+        finally:
+            if cutoff > -np.inf:
+                self.optimiser.remove_constraints(["IncumbentCutoff"])
+        return pulp.value(self.optimiser.prob.objective) if self.optimiser.prob.status == pulp.LpStatusOptimal else -np.inf
+
+    def plan_chips(self) -> pd.DataFrame:
+        """
+        Calculates the optimal team selection and chip placement over the horizon. Returns the results DataFrame of the
+        best plan and sets a placements DataFrame recording the bound, objective and outcome of every placement.
+        """
+        start_time = time.time()
+        print(f"Planning chips {self.chips} over a {self.optimiser_kwargs.get('gameweeks', 3)}-gameweek forecast, starting from GW: {self.start_gameweek}...")
+        self.optimiser = self.build_model()
+        placements = self.candidate_placements()
+        bounds = self.bound_placements(placements)
+
+        # Solve placements in order of their bound, the rest are pruned once no bound can beat the best plan.
+        incumbent, best_values, best_placement, records = -np.inf, None, None, []
+        for k in np.argsort(bounds, kind="stable")[::-1]:
+            placement, bound = placements[k], bounds[k]
+            elapsed = time.time() - start_time
+            if bound <= incumbent + self.tolerance:
+                records.append({**placement, "bound": bound, "status": "pruned"})
+                continue
+            if self.time_limit is not None and elapsed >= self.time_limit and best_values is not None:
+                records.append({**placement, "bound": bound, "status": "unexplored"})
+                continue
+
+            # The time limit only applies once a plan has been found.
+            time_limit = None if self.time_limit is None or best_values is None else self.time_limit - elapsed
+            objective = self.solve_placement(placement, incumbent + self.tolerance, time_limit)
+            if objective == -np.inf:
+                # No plan beats the cutoff (or, without one, no plan exists) - stopped on time, the placement remains open.
+                status = "stopped" if self.optimiser.prob.status == pulp.LpStatusNotSolved else "pruned" if incumbent > -np.inf else "infeasible"
+                records.append({**placement, "bound": bound, "status": status})
+                continue
+
+            solved = self.optimiser.prob.sol_status == pulp.LpSolutionOptimal
+            records.append({**self.optimiser.chip_placement(), "bound": bound, "objective": objective, "status": "solved" if solved else "stopped"})
+            if objective > incumbent:
+                incumbent, best_placement = objective, self.optimiser.chip_placement()
+                best_values = {var.name: var.varValue for var in self.optimiser.prob.variables()}
+
+        if best_values is None:
+            raise RuntimeError("Error: No feasible chip placement found!")
+
+        # Restore the best plan and extract its results.
+        self.optimiser.release_chips()
+        self.optimiser.fix_chips(best_placement)
+        for var in self.optimiser.prob.variables():
+            var.varValue = best_values[var.name]
+        self.optimiser.prob.status = pulp.LpStatusOptimal
+        self.optimiser.extract_results()
+        self.results_df = self.optimiser.results_df
+
+        self.placements_df = pd.DataFrame(records, columns=self.chips + ["bound", "objective", "status"])
+        counts = self.placements_df["status"].value_counts()
+        print(f"Chip placements: {len(placements)} ({counts.get('solved', 0) + counts.get('stopped', 0)} solved, {counts.get('pruned', 0)} pruned by bound, {counts.get('unexplored', 0)} unexplored)")
+        if counts.get("unexplored", 0) or counts.get("stopped", 0):
+            open_bounds = self.placements_df.loc[self.placements_df["status"].isin(["unexplored", "stopped"]), "bound"]
+            print(f"Time limit reached - best plan is within {round(max(open_bounds.max() - incumbent, 0), 2)} points of the optimum")
+        print(f"Chip placement: {', '.join(f'{chip} GW{t}' for chip, t in best_placement.items() if t is not None) or 'N/A'}")
+        print("Optimisation process complete!")
+        print(f"Time taken: {round(time.time() - start_time, 2)} seconds")
+        return self.results_df
@@ -0,0 +1,44 @@
+import numpy as np
+
+# Position codes follow the ordering of MILPOptimiser.POSITIONS (GKP, DEF, MID, FWD).
+# Minimum and maximum number of starters per position - the allowed formations are exactly
+# the (DEF, MID, FWD) combinations within these bounds that sum to 10 outfield players.
+MIN_STARTERS = np.array([1, 3, 2, 1])
+MAX_STARTERS = np.array([1, 5, 5, 3])
+STARTERS = 11
+
+
+def best_lineups(points: np.ndarray, gains: np.ndarray, positions: np.ndarray) -> tuple:
+    """
+    Computes the optimal starting XI, captain and vice-captain for fixed squads in closed form.
+    All inputs are arrays of shape (gameweeks, 15) describing each gameweek's squad:
+        points - expected points used to rank captain and vice-captain choices.
+        gains - objective gain of starting a player rather than benching them.
+        positions - integer position codes (0=GKP, 1=DEF, 2=MID, 3=FWD).
+    Returns a boolean starters mask of shape (gameweeks, 15) and the squad slot of the captain and
+    vice-captain for each gameweek.
+    """
+    points, gains, positions = np.asarray(points, dtype=float), np.asarray(gains, dtype=float), np.asarray(positions)
+    rows = np.arange(points.shape[0])[:, None]
+
+    # Rank players within their position by descending gain (stable, so ties keep squad order).
+    order = np.lexsort((-gains, positions), axis=1)
+    sorted_positions = np.take_along_axis(positions, order, axis=1)
+    first_of_position = np.argmax(sorted_positions[:, :, None] == np.arange(len(MIN_STARTERS))[None, None, :], axis=1)
+    sorted_rank = np.arange(positions.shape[1])[None, :] - np.take_along_axis(first_of_position, sorted_positions, axis=1)
+    rank = np.empty_like(sorted_rank)
+    rank[rows, order] = sorted_rank
+
+    # Formation minimums are always started, the remaining slots go to the best eligible players.
+    mandatory = rank < MIN_STARTERS[positions]
+    eligible = ~mandatory & (rank < MAX_STARTERS[positions])
+    free_slots = STARTERS - MIN_STARTERS.sum()
+    optional_gains = np.where(eligible, gains, -np.inf)
+    optional_picks = np.argsort(-optional_gains, axis=1, kind="stable")[:, :free_slots]
+    starters = mandatory.copy()
+    starters[rows, optional_picks] = True
+
+    # Captain and vice-captain are the two highest scoring starters.
+    starter_points = np.where(starters, points, -np.inf)
+    ranked_starters = np.argsort(-starter_points, axis=1, kind="stable")
+    return starters, ranked_starters[:, 0], ranked_starters[:, 1]
@@ -3,8 +3,96 @@ import numpy as np
 import pulp
 import time
 import os
+import re
+import queue
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+from typing import Callable, Iterator
 
 from ..utils import DATA_DIR
+from ..data import PlayerPool
+from .lineup import best_lineups
+
+class _InterruptibleCBC(pulp.PULP_CBC_CMD):
+    """
+    CBC command whose running solve can be interrupted from another thread. CBC stops on SIGINT as on its time limit,
+    so the best incumbent found is still read back. It ignores the signal until branch and bound starts, so the signal
+    is repeated, and CBC killed if it has not stopped within INTERRUPT_GRACE_PERIOD seconds. A solve interrupted
+    before it finds an incumbent is left not solved. Given a logPath, each line CBC logs is passed to progress as the
+    solve runs (CBC only flushes its log line by line when run through stdbuf, otherwise lines arrive in blocks).
+    """
+
+    INTERRUPT_GRACE_PERIOD = 1.0
+
+    def __init__(self, *args, progress: Callable = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.interrupted = threading.Event()
+        self.progress = progress
+
+    def interrupt(self) -> None:
+        """Interrupts the running solve, and any solve started afterwards."""
+        self.interrupted.set()
+
+    def solve_CBC(self, lp: pulp.LpProblem, use_mps: bool = True) -> int:
+        """Solves the problem as PULP_CBC_CMD does (from an MPS file), interrupting CBC once interrupt is called."""
+        if self.interrupted.is_set():
+            lp.assignStatus(pulp.LpStatusNotSolved, pulp.LpSolutionNoSolutionFound)
+            return lp.status
+
+        tmp_mps, tmp_sol, tmp_mst = self.create_tmp_files(lp.name, "mps", "sol", "mst")
+        variables, variable_names, constraint_names, _ = lp.writeMPS(tmp_mps, rename=1)
+        args = [self.path, tmp_mps] + (["-max"] if lp.sense == pulp.LpMaximize else [])
+        if self.optionsDict.get("warmStart", False):
+            self.writesol(tmp_mst, lp, variables, variable_names, constraint_names)
+            args += ["-mips", tmp_mst]
+        if self.timeLimit is not None:
+            args += ["-sec", str(self.timeLimit)]
+        args += [arg for option in self.options + self.getOptions() for arg in f"-{option}".split()]
+        args += ["-branch" if self.mip else "-initialSolve", "-printingOptions", "all", "-solution", tmp_sol]
+
+        log_path = self.optionsDict.get("logPath")
+        progress = self.progress if log_path else None
+        if progress is not None and shutil.which("stdbuf"):
+            args = ["stdbuf", "-oL"] + args
+        with open(log_path or os.devnull, "w") as pipe, open(log_path or os.devnull, "r") as log:
+            output = None if self.msg and not log_path else pipe
+            process, interrupted_at, partial_line = subprocess.Popen(args, stdout=output, stderr=output, stdin=subprocess.DEVNULL), None, ""
+            while True:
+                try:
+                    return_code = process.wait(timeout=0.1)
+                except subprocess.TimeoutExpired:
+                    return_code = None
+                if progress is not None:
+                    *lines, partial_line = (partial_line + log.read()).split("\n")
+                    for line in lines + ([partial_line] if return_code is not None and partial_line else []):
+                        progress(line)
+                if return_code is not None:
+                    break
+                if self.interrupted.is_set():
+                    interrupted_at = interrupted_at or time.time()
+                    if time.time() - interrupted_at > self.INTERRUPT_GRACE_PERIOD:
+                        process.kill()
+                    else:
+                        process.send_signal(signal.SIGINT)
+
+        if return_code != 0 or not os.path.exists(tmp_sol):
+            self.delete_tmp_files(tmp_mps, tmp_sol, tmp_mst)
+            if self.interrupted.is_set():
+                lp.assignStatus(pulp.LpStatusNotSolved, pulp.LpSolutionNoSolutionFound)
+                return lp.status
+            raise pulp.PulpSolverError(f"Pulp: Error while executing {self.path}")
+        status, values, reduced_costs, shadow_prices, slacks, sol_status = self.readsol_MPS(tmp_sol, lp, variables, variable_names, constraint_names)
+        lp.assignVarsVals(values)
+        lp.assignVarsDj(reduced_costs)
+        lp.assignConsPi(shadow_prices)
+        lp.assignConsSlack(slacks, activity=True)
+        lp.assignStatus(status, sol_status)
+        self.delete_tmp_files(tmp_mps, tmp_sol, tmp_mst)
+        return status
+
 
 class MILPOptimiser:
     """
@@ -22,6 +110,21 @@ class MILPOptimiser:
 
     FORMATIONS_DICT = {idx: formation for idx, formation in enumerate(FORMATIONS)}  # Convert allowed formations in to a dictionary for easier indexing
 
+    # Squad rules: players per position, players per club and the minimum total expected minutes of the squad.
+    SQUAD_QUOTAS = {"GKP": 2, "DEF": 5, "MID": 5, "FWD": 3}
+    MAX_PER_TEAM = 3
+    MIN_SQUAD_MINUTES = 15 * 70.0
+
+    # Chips, each played at most once over the horizon and at most one per gameweek. Transfer chips lift the transfer
+    # limit for their gameweek (a free hit squad also reverts in the following gameweek), lineup chips add points.
+    CHIPS = ["wildcard", "free_hit", "bench_boost", "triple_captain"]
+    TRANSFER_CHIPS = ["wildcard", "free_hit"]
+    SQUAD_SIZE = 15  # Transfers allowed in a transfer chip gameweek.
+
+    # Secondary objectives traded off against expected points by pareto_frontier, with the sense in which each is optimised.
+    FRONTIER_OBJECTIVES = {"injury": pulp.LpMinimize, "variance": pulp.LpMinimize, "value": pulp.LpMaximize}
+    FRONTIER_TIE_BREAK = 1e-4  # Weight of expected points in the secondary objective, choosing the best squad among those tied on it.
+
     def __init__(self, 
                  player_data_df: pd.DataFrame, 
                  start_gameweek: int,
@@ -35,12 +138,20 @@ class MILPOptimiser:
                  k: float = 0.3,
                  use_price_model: bool = True,
                  validation: bool = True,
-                 use_existing_team: bool = False) -> None:
+                 use_existing_team: bool = False,
+                 decomposed: bool = False,
+                 player_pool: PlayerPool = None,
+                 existing_team_df: pd.DataFrame = None,
+                 chips: list = None,
+                 banked_transfers: bool = False,
+                 free_transfers: int = 1,
+                 max_free_transfers: int = 5,
+                 max_transfers: int = 4,
+                 hit_cost: float = 4.0) -> None:
         
         # Understand the data being fed in - if gw field exceeds self.gameweeks raise error.
         # Set attributes.
         self.player_data_df = player_data_df
-        self.indices = player_data_df.index
         self.start_gameweek = start_gameweek
         self.gameweeks = gameweeks
         self.t0_team_value = t0_team_value
@@ -53,8 +164,23 @@ class MILPOptimiser:
         self.use_price_model = use_price_model
         self.validation = validation
         self.use_existing_team = use_existing_team
-        self.position_groups = {pos: set(player_data_df[player_data_df["position"] == pos].index) for pos in self.POSITIONS}
-        self.team_groups = {team: set(player_data_df[player_data_df["team"] == team].index) for team in self.TEAMS}
+        self.decomposed = decomposed
+        self.chips = list(chips or [])
+
+        # Banked transfers replace the single transfer per gameweek: unused free transfers are banked (up to
+        # max_free_transfers), up to max_transfers can be made per gameweek and each beyond the free ones costs hit_cost.
+        # free_transfers are those available in the first gameweek with transfers.
+        self.banked_transfers = banked_transfers
+        self.free_transfers = free_transfers
+        self.max_free_transfers = max_free_transfers
+        self.max_transfers = max_transfers
+        self.hit_cost = hit_cost
+
+        if set(self.chips) - set(self.CHIPS):
+            raise ValueError(f"Error: Unknown chips {sorted(set(self.chips) - set(self.CHIPS))}, expected a subset of {self.CHIPS}!")
+
+        if banked_transfers and not (0 <= free_transfers <= max_free_transfers and 1 <= max_transfers <= self.SQUAD_SIZE):
+            raise ValueError(f"Error: Free transfers must be between 0 and max_free_transfers ({max_free_transfers}) and max_transfers between 1 and {self.SQUAD_SIZE}!")
 
         if start_gameweek == 1 and (self.t0_team_value > 100.0 or self.t0_team_value + self.excess_budget > 100.0):
             raise RuntimeError("Error: Total funds cannot be great than £100mn in GW1!")
@@ -63,16 +189,11 @@ class MILPOptimiser:
             if start_gameweek ==  1:
                 raise RuntimeError("Error: Cannot have an existing team prior to GW1")
             
-            # Define dict to hold existing team dataframe index values.
-            self.existing_team = {}
-            filename = f"FPL 24_25 season - team GW{start_gameweek-1}.csv"
-            existing_team_df = pd.read_csv(os.path.join(DATA_DIR, "official_api_data", filename)).drop(columns="position")
-            player_data_df = pd.merge(player_data_df, existing_team_df, left_on="id", right_on="element", how="left")
-            existing_team_indices = player_data_df[~player_data_df["element"].isna()]
-            self.existing_team["outfield"] = set(existing_team_indices[existing_team_indices["multiplier"] != 0.0].index)
-            self.existing_team["bench"] = set(existing_team_indices[existing_team_indices["multiplier"] == 0.0].index)
-            self.existing_team["captain"] = set(existing_team_indices[existing_team_indices["is_captain"] == True].index)
-            self.existing_team["vice_captain"] = set(existing_team_indices[existing_team_indices["is_vice_captain"] == True].index)
+            # Existing team picks are read from disk unless provided in memory.
+            if existing_team_df is None:
+                filename = f"FPL 24_25 season - team GW{start_gameweek-1}.csv"
+                existing_team_df = pd.read_csv(os.path.join(DATA_DIR, "official_api_data", filename))
+            self.set_existing_team(existing_team_df)
 
             # Define start and end points for temporal constraints
             # E.g. GW2 with existing team yields a projecton from GW1 -> GW4 inclusive.
@@ -81,136 +202,578 @@ class MILPOptimiser:
             # Different start and end points for temporal constraints.
             self.start_t, self.end_t = start_gameweek, start_gameweek + gameweeks
         
-        self.pts_by_gw = {t: dict(zip(self.indices, list(np.array(self.player_data_df[f"ep_gw{t}"]) * (self.time_decay ** (t - 1))))) for t in range(self.start_gameweek, self.end_t)}  # Exp. pts by gameweek with time decay applied
-        self.baseline_pts_by_player = {idx: self.player_data_df.at[idx, f"ep_gw{start_gameweek}"] for idx in self.indices}  # Initial expected points (baseline for each player) - can use pts_by_gw (TBC)
-        self.mins_played = dict(zip(self.indices, list(self.player_data_df["xmins"])))
+        # Array-backed player data, rows follow player_data_df and columns the gameweeks start_gameweek -> end_t - 1.
+        # A shared pool may cover more gameweeks than this optimiser, in which case the relevant columns are selected.
+        if player_pool is None:
+            player_pool = PlayerPool.from_dataframe(self.player_data_df, range(self.start_gameweek, self.end_t), self.POSITIONS, self.TEAMS)
+        elif not player_pool.index.equals(self.player_data_df.index):
+            raise ValueError("Error: The player pool rows must follow the player data DataFrame index!")
+        self.player_pool = player_pool
+        self.indices = player_pool.index
+        columns = player_pool.columns(range(self.start_gameweek, self.end_t))
+        col_t0 = columns[0]
+
+        self.pts_by_gw = player_pool.points[:, columns] * (self.time_decay ** (np.arange(self.start_gameweek, self.end_t) - 1))  # Exp. pts by gameweek with time decay applied
+        self.baseline_pts_by_player = player_pool.points[:, col_t0]  # Initial expected points (baseline for each player)
+        self.mins_played = player_pool.minutes[:, col_t0]
+        self.bench_weights = np.where(player_pool.positions[:, col_t0] == self.POSITIONS.index("GKP"), self.gkp_bench_weight, self.bench_weight)
+        self.position_groups = {pos: self.indices[player_pool.position_group(pos, self.start_gameweek)] for pos in self.POSITIONS}
+        self.team_groups = {team: self.indices[player_pool.team_group(team, self.start_gameweek)] for team in self.TEAMS}
 
-        # Calculate and add estimated player costs to dataframe.
+        # Calculate estimated player costs (players x gameweeks).
         self.estimated_costs_by_gw = self.estimate_player_costs()
-        for t in range(self.start_gameweek, self.end_t):
-            self.player_data_df[f"ep_cost_gw{t}"] = self.estimated_costs_by_gw[t].values()
+
+    def set_existing_team(self, existing_team_df: pd.DataFrame) -> None:
+        """
+        Defines a dict holding the dataframe index values of the existing team, given a DataFrame of picks
+        in the format returned by FplAPIData.get_gw_team_lineup_data (element, multiplier, is_captain, is_vice_captain).
+        """
+        existing_team_df = existing_team_df.drop(columns="position", errors="ignore")
+        player_data_df = self.player_data_df[["id"]].join(existing_team_df.set_index("element"), on="id")
+        existing_team_indices = player_data_df[~player_data_df["multiplier"].isna()]
+        self.existing_team = {}
+        self.existing_team["outfield"] = set(existing_team_indices[existing_team_indices["multiplier"] != 0.0].index)
+        self.existing_team["bench"] = set(existing_team_indices[existing_team_indices["multiplier"] == 0.0].index)
+        self.existing_team["captain"] = set(existing_team_indices[existing_team_indices["is_captain"] == True].index)
+        self.existing_team["vice_captain"] = set(existing_team_indices[existing_team_indices["is_vice_captain"] == True].index)
+
+    def chip_gameweeks(self, chip: str) -> range:
+        """Returns the gameweeks in which the given chip can be played, transfer chips need a preceding gameweek."""
+        return range(self.start_t + 1, self.end_t) if chip in self.TRANSFER_CHIPS else range(self.start_gameweek, self.end_t)
+
+    def chip_indicator(self, chips: list, t: int) -> pulp.LpAffineExpression:
+        """Returns the sum of the chip decision variables for the given chips in gameweek t (zero where not available)."""
+        return pulp.lpSum([self.z_chip[chip][t] for chip in chips if chip in self.chips and t in self.chip_gameweeks(chip)])
+
+    def fix_chips(self, placement: dict) -> None:
+        """
+        Fixes the gameweek in which each chip in the placement is played (None for not played) by setting the bounds
+        of its decision variables. Chips absent from the placement are left for the solver to place.
+        """
+        for chip, gameweek in placement.items():
+            for t, var in self.z_chip[chip].items():
+                var.lowBound = var.upBound = int(t == gameweek)
+
+    def release_chips(self) -> None:
+        """Releases all chip decision variables, leaving every chip for the solver to place."""
+        for var in (var for chip in self.chips for var in self.z_chip[chip].values()):
+            var.lowBound, var.upBound = 0, 1
+
+    def chip_placement(self) -> dict:
+        """Returns the gameweek in which each chip is played in the current solution, or None if not played."""
+        return {chip: next((t for t, var in self.z_chip[chip].items() if round(var.varValue or 0) == 1), None) for chip in self.chips}
+
+    def chip_multipliers(self, placement: dict) -> tuple:
+        """
+        Returns the bench weights (players x gameweeks) and extra captain multipliers (gameweeks) implied by a chip placement:
+        the bench counts fully in a bench boost gameweek and the captain scores triple in a triple captain gameweek.
+        """
+        gameweeks = np.arange(self.start_gameweek, self.end_t)
+        bench_weights = np.where(gameweeks[None, :] == placement.get("bench_boost"), 1.0, self.bench_weights[:, None])
+        captain_multipliers = np.where(gameweeks == placement.get("triple_captain"), 2.0, 1.0)
+        return bench_weights, captain_multipliers
 
     @staticmethod
     def sigmoid(x, k=0.3, midpoint=0) -> float:
         """ Sigmoid function used to model non-linear player price adjustments."""
         return 1 / (1 + np.exp(-k * (x - midpoint)))
     
-    def estimate_player_costs(self) -> dict:
+    def estimate_player_costs(self) -> np.ndarray:
         """
-        Creates a dictionary of containing player index and estimated player cost key-value pairs for each gameweek.
+        Creates an array of estimated player costs with a row per player and a column per gameweek.
         Estimates player costs using a sigmoid function for price change.
         """
-        estimated_costs_by_gw = {}
-        for t in range(self.start_gameweek, self.end_t):
-            estimated_costs_by_gw[t] = {}
-            for idx in self.indices:
-                if t == self.start_gameweek or not self.use_price_model:
-                    estimated_costs_by_gw[t][idx] = self.player_data_df.at[idx, "now_cost"]
-                else:
-                    score_diff = self.pts_by_gw[t][idx] - self.baseline_pts_by_player[idx]
-                    price_change = self.max_price_change * (2 * self.sigmoid(score_diff, k=self.k) - 1)
-                    estimated_costs_by_gw[t][idx] = round(estimated_costs_by_gw[t-1][idx] + price_change, 1)
-        
+        estimated_costs_by_gw = np.repeat(self.player_pool.costs[:, [self.player_pool.column(self.start_gameweek)]], self.gameweeks, axis=1)
+        if self.use_price_model:
+            for j in range(1, self.gameweeks):
+                score_diff = self.pts_by_gw[:, j] - self.baseline_pts_by_player
+                price_change = self.max_price_change * (2 * self.sigmoid(score_diff, k=self.k) - 1)
+                estimated_costs_by_gw[:, j] = np.round(estimated_costs_by_gw[:, j-1] + price_change, 1)
+
         return estimated_costs_by_gw
 
+    def quota_totals(self, values: np.ndarray, positions: np.ndarray, teams: np.ndarray) -> np.ndarray:
+        """
+        Returns, for each position, the smallest total of values over the players filling its squad quota when at
+        most MAX_PER_TEAM players of a position come from one club (inf where the quota cannot be filled). Relaxing
+        the club limit to each position separately makes the sum over positions a lower bound for any valid squad.
+        """
+        keep = np.isfinite(values) & (positions >= 0)
+        rows = np.flatnonzero(keep)[np.lexsort((values[keep], teams[keep], positions[keep]))]
+        position, team = positions[rows], teams[rows]
+
+        # Rank of each player within their club and position, counting from the smallest value.
+        first = np.r_[True, (position[1:] != position[:-1]) | (team[1:] != team[:-1])]
+        club_rank = np.arange(len(rows)) - np.maximum.accumulate(np.where(first, np.arange(len(rows)), 0))
+        rows = rows[(club_rank < self.MAX_PER_TEAM) | (team < 0)]
+
+        totals = np.full(len(self.POSITIONS), np.inf)
+        for k, pos in enumerate(self.POSITIONS):
+            candidates = np.sort(values[rows[positions[rows] == k]])[:self.SQUAD_QUOTAS[pos]]
+            if len(candidates) == self.SQUAD_QUOTAS[pos]:
+                totals[k] = candidates.sum()
+        return totals
+
+    def screen_feasibility(self) -> list:
+        """
+        Screens the inputs for conditions that make the LP problem infeasible (quotas, budget, minutes and the existing
+        team), without building it. Returns a list describing each problem found, empty when none are found.
+        """
+        issues = []
+        col_t0 = self.player_pool.column(self.start_gameweek)
+        positions, teams = self.player_pool.positions[:, col_t0], self.player_pool.teams[:, col_t0]
+        budget = self.t0_team_value + self.excess_budget
+
+        # Most expected minutes (the smallest total of negated minutes) and cheapest squads, by position.
+        minutes_totals = -self.quota_totals(-self.mins_played, positions, teams)
+        for k in np.flatnonzero(np.isinf(minutes_totals)):
+            issues.append(f"Too few {self.POSITIONS[k]} players to fill a quota of {self.SQUAD_QUOTAS[self.POSITIONS[k]]} with at most {self.MAX_PER_TEAM} per club.")
+        if issues:
+            return issues
+        if minutes_totals.sum() < self.MIN_SQUAD_MINUTES:
+            issues.append(f"The squad with the most expected minutes totals {round(minutes_totals.sum(), 1)} minutes, below the {self.MIN_SQUAD_MINUTES} required.")
+        for j, t in enumerate(range(self.start_gameweek, self.end_t)):
+            min_cost = self.quota_totals(self.estimated_costs_by_gw[:, j], positions, teams).sum()
+            if min_cost > budget + 1e-9:
+                issues.append(f"GW{t}: The cheapest squad meeting the position quotas costs at least £{round(min_cost, 1)}mn, above the budget of £{round(budget, 1)}mn (t0_team_value + excess_budget).")
+
+        if self.use_existing_team:
+            issues += self.screen_existing_team(positions, teams, budget)
+        return issues
+
+    def screen_existing_team(self, positions: np.ndarray = None, teams: np.ndarray = None, budget: float = None) -> list:
+        """
+        Screens the existing team for screen_feasibility, returning a list describing each problem found. Positions,
+        teams and budget default to those of start_gameweek, so a team set with set_existing_team can be screened alone.
+        """
+        col_t0 = self.player_pool.column(self.start_gameweek)
+        positions = self.player_pool.positions[:, col_t0] if positions is None else positions
+        teams = self.player_pool.teams[:, col_t0] if teams is None else teams
+        budget = self.t0_team_value + self.excess_budget if budget is None else budget
+        issues, team = [], self.existing_team
+        if len(team["outfield"]) != 11 or len(team["bench"]) != 4 or team["outfield"] & team["bench"]:
+            issues.append(f"The existing team has {len(team['outfield'])} starters and {len(team['bench'])} substitutes in the player data, "
+                          "expected 11 and 4 (check the picks' element ids).")
+        if len(team["captain"]) != 1 or len(team["vice_captain"]) != 1 or not team["captain"] | team["vice_captain"] <= team["outfield"] or team["captain"] & team["vice_captain"]:
+            issues.append("The existing team must have one captain and a different vice-captain, both starting.")
+        if issues:
+            return issues
+
+        # Transfers available in start_gameweek, unlimited if a transfer chip can be played.
+        in_squad = self.indices.isin(list(team["outfield"] | team["bench"]))
+        chips = [chip for chip in self.TRANSFER_CHIPS if chip in self.chips and self.start_gameweek in self.chip_gameweeks(chip)]
+        transfers = self.SQUAD_SIZE if chips else self.max_transfers if self.banked_transfers else 1
+
+        # Each transfer can remove at most one surplus player from a position or club.
+        position_counts = np.bincount(positions[in_squad], minlength=len(self.POSITIONS))
+        club_counts = np.bincount(teams[in_squad & (teams >= 0)], minlength=len(self.TEAMS))
+        position_surplus = sum(max(position_counts[k] - self.SQUAD_QUOTAS[pos], 0) for k, pos in enumerate(self.POSITIONS))
+        club_surplus = np.maximum(club_counts - self.MAX_PER_TEAM, 0)
+        if max(position_surplus, club_surplus.sum()) > transfers:
+            surplus = [f"{count} {pos}" for pos, count in zip(self.POSITIONS, position_counts) if count > self.SQUAD_QUOTAS[pos]]
+            surplus += [f"{club_counts[k]} {self.TEAMS[k]}" for k in np.flatnonzero(club_surplus)]
+            issues.append(f"The existing team ({', '.join(surplus)} players) needs at least {max(position_surplus, club_surplus.sum())} transfers in "
+                          f"GW{self.start_gameweek} to meet the position quotas and club limits, but only {transfers} {'is' if transfers == 1 else 'are'} allowed.")
+        if position_surplus:
+            return issues  # Transfers must then change positions, which the swaps below do not model.
+
+        # The best transfers swap squad players for the cheapest (or most minutes) players outside the squad in the same
+        # position, ignoring club limits. Within a position each further swap gains less, so the best swaps over all
+        # positions are taken greedily, separately for cost and minutes.
+        def best_swaps(values: np.ndarray) -> float:
+            gains = []
+            for k in range(len(self.POSITIONS)):
+                squad_values = np.sort(values[in_squad & (positions == k) & ~np.isnan(values)])[::-1]
+                other_values = np.sort(values[~in_squad & (positions == k) & ~np.isnan(values)])
+                swaps = min(len(squad_values), len(other_values))
+                gains.append(squad_values[:swaps] - other_values[:swaps])
+            gains = np.sort(np.concatenate(gains))[::-1][:transfers]
+            return gains[gains > 0].sum()
+
+        costs = self.estimated_costs_by_gw[:, 0]
+        best_cost_saving, best_minutes_gain = best_swaps(costs), best_swaps(-self.mins_played)
+        squad_cost, squad_minutes = np.nansum(costs[in_squad]), np.nansum(self.mins_played[in_squad])
+        allowed = "one transfer" if transfers == 1 else f"{transfers} transfers"
+        if squad_cost - best_cost_saving > budget + 1e-9:
+            issues.append(f"GW{self.start_gameweek}: The existing team costs £{round(squad_cost, 1)}mn and {allowed} can save at most "
+                          f"£{round(best_cost_saving, 1)}mn, above the budget of £{round(budget, 1)}mn (t0_team_value + excess_budget).")
+        if squad_minutes + best_minutes_gain < self.MIN_SQUAD_MINUTES:
+            issues.append(f"GW{self.start_gameweek}: The existing team totals {round(squad_minutes, 1)} expected minutes and {allowed} can add at most "
+                          f"{round(best_minutes_gain, 1)}, below the {self.MIN_SQUAD_MINUTES} required.")
+        return issues
+
     def objective_function(self) -> pulp.LpAffineExpression:
         """
         Defines the objective function to be used within the optimisation algorithm and returns a pulp.LpAffineExpression object.
         """
         # Objective function: Sum of expected points across all gameweeks with time decay (decay incorporated within pts_by_gw).
-        return pulp.lpSum([
-            (self.pts_by_gw[t][idx] * self.x_captain[idx][t]) +  # Captain's points
-            (self.pts_by_gw[t][idx] * (self.x_outfield[idx][t] + (self.gkp_bench_weight if self.player_data_df.at[idx, "position"] == "GKP" else self.bench_weight) * self.x_bench[idx][t])) +
-            (self.pts_by_gw[t][idx] * 0.1 * self.x_vice_captain[idx][t])  # Vice-captain's points
-            for idx in self.indices for t in range(self.start_gameweek, self.end_t)
+        # Bench boost adds the unweighted points of benched players, triple captain a further captain's points.
+        chip_weights = {"bench_boost": 1 - self.bench_weights, "triple_captain": np.ones(len(self.indices))}
+        chip_points = pulp.lpSum([
+            self.pts_by_gw[i, j] * chip_weights[chip][i] * self.x_chip[chip][idx][t]
+            for chip in self.x_chip for i, idx in enumerate(self.indices) for j, t in enumerate(range(self.start_gameweek, self.end_t))
         ])
+        return pulp.lpSum([
+            (self.pts_by_gw[i, j] * self.x_captain[idx][t]) +  # Captain's points
+            (self.pts_by_gw[i, j] * (self.x_outfield[idx][t] + self.bench_weights[i] * self.x_bench[idx][t])) +
+            (self.pts_by_gw[i, j] * 0.1 * self.x_vice_captain[idx][t])  # Vice-captain's points
+            for i, idx in enumerate(self.indices) for j, t in enumerate(range(self.start_gameweek, self.end_t))
+        ]) + chip_points - self.hit_costs()
+
+    def hit_costs(self) -> pulp.LpAffineExpression:
+        """Returns the points deducted for paid transfers with time decay applied, zero unless transfers are banked."""
+        if not self.banked_transfers:
+            return pulp.LpAffineExpression()
+        return pulp.lpSum([self.hit_cost * self.time_decay ** (t - 1) * self.h_paid_transfers[t] for t in self.h_paid_transfers])
 
     def initialise_optimisation(self) -> None:
         """Initialise linear programming problem and define key decision variables."""
         
+        # Decomposed mode only branches on squad selection, lineup and transfer variables are relaxed
+        # since the lineup is recovered in closed form once the squads are known.
+        cat = pulp.LpContinuous if self.decomposed else pulp.LpBinary
+
         # Create key decision variables.
-        self.x_outfield = pulp.LpVariable.dicts("x_outfield", (self.indices, range(self.start_t, self.end_t)), cat=pulp.LpBinary)
-        self.x_bench = pulp.LpVariable.dicts("x_bench", (self.indices, range(self.start_t, self.end_t)), cat=pulp.LpBinary)
-        self.x_captain = pulp.LpVariable.dicts("x_captain", (self.indices, range(self.start_t, self.end_t)), cat=pulp.LpBinary)
-        self.x_vice_captain = pulp.LpVariable.dicts("x_vice_captain", (self.indices, range(self.start_t, self.end_t)), cat=pulp.LpBinary)
-        self.y_transfer_in = pulp.LpVariable.dicts("y_transfer_in", (self.indices, range(self.start_t + 1, self.end_t)), cat=pulp.LpBinary)
-        self.y_transfer_out = pulp.LpVariable.dicts("y_transfer_out", (self.indices, range(self.start_t + 1, self.end_t)), cat=pulp.LpBinary)
-        self.formation_vars = pulp.LpVariable.dicts("formation_vars", (range(len(self.FORMATIONS)), range(self.start_gameweek, self.end_t)), cat=pulp.LpBinary)
-    
+        self.x_outfield = pulp.LpVariable.dicts("x_outfield", (self.indices, range(self.start_t, self.end_t)), lowBound=0, upBound=1, cat=cat)
+        self.x_captain = pulp.LpVariable.dicts("x_captain", (self.indices, range(self.start_t, self.end_t)), lowBound=0, upBound=1, cat=cat)
+        self.x_vice_captain = pulp.LpVariable.dicts("x_vice_captain", (self.indices, range(self.start_t, self.end_t)), lowBound=0, upBound=1, cat=cat)
+        self.y_transfer_in = pulp.LpVariable.dicts("y_transfer_in", (self.indices, range(self.start_t + 1, self.end_t)), lowBound=0, upBound=1, cat=cat)
+        self.y_transfer_out = pulp.LpVariable.dicts("y_transfer_out", (self.indices, range(self.start_t + 1, self.end_t)), lowBound=0, upBound=1, cat=cat)
+        if self.decomposed:
+            # Bench selection is expressed through the squad, so x_outfield + x_bench reduces to x_squad in every constraint.
+            self.x_squad = pulp.LpVariable.dicts("x_squad", (self.indices, range(self.start_t, self.end_t)), cat=pulp.LpBinary)
+            self.x_bench = {idx: {t: self.x_squad[idx][t] - self.x_outfield[idx][t] for t in range(self.start_t, self.end_t)} for idx in self.indices}
+        else:
+            self.x_bench = pulp.LpVariable.dicts("x_bench", (self.indices, range(self.start_t, self.end_t)), cat=pulp.LpBinary)
+            self.formation_vars = pulp.LpVariable.dicts("formation_vars", (range(len(self.FORMATIONS)), range(self.start_gameweek, self.end_t)), cat=pulp.LpBinary)
+
+        # Chip decision variables (chip played in a gameweek) and the players boosted by lineup chips (benched players
+        # in a bench boost gameweek, the captain in a triple captain gameweek).
+        self.z_chip = {chip: pulp.LpVariable.dicts(f"z_{chip}", self.chip_gameweeks(chip), cat=pulp.LpBinary) for chip in self.chips}
+        self.x_chip = {chip: pulp.LpVariable.dicts(f"x_{chip}", (self.indices, self.chip_gameweeks(chip)), lowBound=0, upBound=1)
+                       for chip in self.chips if chip not in self.TRANSFER_CHIPS}
+
+        # Banked transfers: free transfers available (state carried over the horizon) and paid transfers in each gameweek
+        # with transfers. Free transfers are bounded by those banked without making any, fixing them in the first gameweek.
+        if self.banked_transfers:
+            self.f_free_transfers = pulp.LpVariable.dicts("f_free_transfers", range(self.start_t + 1, self.end_t), lowBound=0)
+            self.h_paid_transfers = pulp.LpVariable.dicts("h_paid_transfers", range(self.start_t + 1, self.end_t), lowBound=0, upBound=self.max_transfers, cat=pulp.LpInteger)
+            for k, var in enumerate(self.f_free_transfers.values()):
+                var.upBound = min(self.free_transfers + k, self.max_free_transfers)
+                var.lowBound = var.upBound if k == 0 else 0
+
         # Initialise optimisation problem.
         self.prob = pulp.LpProblem("MaximizeObjectiveMultiGW", pulp.LpMaximize)  # create a pulp LpProblem and set it as an attribute.
         self.prob += self.objective_function(), "Objective"
 
+    def add_existing_team_constraints(self) -> list:
+        """Adds equality constraints fixing the existing team in the gameweek prior to start_gameweek and returns their names."""
+        constraints = []
+        for idx in self.indices:
+            if idx in self.existing_team["outfield"]:
+                constraints.append((self.x_outfield[idx][self.start_t] == 1, f"SetOutfieldValue_{idx}_GW{self.start_t}"))
+            if idx in self.existing_team["bench"]:
+                constraints.append((self.x_bench[idx][self.start_t] == 1, f"SetBenchValue_{idx}_GW{self.start_t}"))
+            if idx in self.existing_team["captain"]:
+                constraints.append((self.x_captain[idx][self.start_t] == 1, f"SetCaptainValue_{idx}_GW{self.start_t}"))
+            if idx in self.existing_team["vice_captain"]:
+                constraints.append((self.x_vice_captain[idx][self.start_t] == 1, f"SetViceCaptainValue_{idx}_GW{self.start_t}"))
+
+        for constraint in constraints:
+            self.prob += constraint
+        return [name for _, name in constraints]
+
+    def remove_constraints(self, names: list) -> None:
+        """Removes the named constraints from the LP problem."""
+        for name in names:
+            del self.prob.constraints[name]
+
+    def warm_start_existing_team(self) -> None:
+        """
+        Sets the initial values of the decision variables to the existing team being held, with no transfers,
+        for the whole horizon. Used as a warm start; the solver discards it if price changes break the budget.
+        """
+        squad = self.existing_team["outfield"] | self.existing_team["bench"]
+        self.set_initial_squads({t: squad for t in range(self.start_t, self.end_t)})
+
+    def held_squad(self) -> set:
+        """
+        Returns the squad (a set of player indices) with the most expected points that can be held over the forecast
+        gameweeks, or an empty set when none can. An existing team keeps all but the transfers available in start_gameweek.
+        """
+        select = pulp.LpVariable.dicts("x_held", self.indices, cat=pulp.LpBinary)
+        prob = pulp.LpProblem("HeldSquad", pulp.LpMaximize)
+        objective = pulp.lpSum([points * select[idx] for idx, points in zip(self.indices, self.pts_by_gw.sum(axis=1))])
+        for pos, quota in self.SQUAD_QUOTAS.items():
+            prob += pulp.lpSum([select[idx] for idx in self.position_groups[pos]]) == quota, f"{pos}Quota"
+        for team in self.TEAMS:
+            prob += pulp.lpSum([select[idx] for idx in self.team_groups[team]]) <= self.MAX_PER_TEAM, f"{team}TeamConstraint"
+        for j, t in enumerate(range(self.start_gameweek, self.end_t)):
+            prob += pulp.lpSum([self.estimated_costs_by_gw[i, j] * select[idx] for i, idx in enumerate(self.indices)]) <= self.t0_team_value + self.excess_budget, f"BudgetConstraint_GW{t}"
+        prob += pulp.lpSum([self.mins_played[i] * select[idx] for i, idx in enumerate(self.indices)]) >= self.MIN_SQUAD_MINUTES, "ProbabilityOfStartingConstraint"
+
+        if self.use_existing_team:
+            squad = self.existing_team["outfield"] | self.existing_team["bench"]
+            transfers = pulp.lpSum([select[idx] for idx in self.indices if idx not in squad])
+            prob += transfers <= (self.max_transfers if self.banked_transfers else 1), "MaxTransfers"
+            if self.banked_transfers:
+                paid_transfers = pulp.LpVariable("h_held", lowBound=0)
+                prob += paid_transfers >= transfers - self.free_transfers, "PaidTransfers"
+                objective -= self.hit_cost * self.time_decay ** (self.start_gameweek - 1) * paid_transfers
+        prob += objective
+
+        prob.solve(pulp.PULP_CBC_CMD(msg=False))
+        if prob.status != pulp.LpStatusOptimal:
+            return set()
+        return {idx for idx in self.indices if round(select[idx].varValue or 0) == 1}
+
+    def set_held_squad(self) -> bool:
+        """Sets the decision variables to the plan holding the held squad (see held_squad), returning whether it is feasible."""
+        squad = self.held_squad()
+        if not squad:
+            return False
+        squads = {t: squad for t in range(self.start_gameweek, self.end_t)}
+        if self.use_existing_team:
+            squads[self.start_t] = self.existing_team["outfield"] | self.existing_team["bench"]
+        self.set_initial_squads(squads)
+        return self.prob.valid(1e-6)
+
+    def set_initial_squads(self, squads: dict) -> None:
+        """
+        Sets the initial values of the decision variables to the plan holding the given squad (a set of player indices)
+        in each gameweek start_t -> end_t - 1, playing no chips. Lineups and captaincy are computed in closed form, apart
+        from an existing team's gameweek, which keeps the existing lineup. Used as a warm start; the solver discards it
+        if it breaks a constraint.
+        """
+        col_t0 = self.player_pool.column(self.start_gameweek)
+        for t in range(self.start_t, self.end_t):
+            if t < self.start_gameweek:
+                lineup = self.existing_team
+            else:
+                rows = self.indices.get_indexer(list(squads[t]))
+                points = self.pts_by_gw[rows, t - self.start_gameweek]
+                starters, captains, vice_captains = best_lineups(points[None], (points * (1 - self.bench_weights[rows]))[None], self.player_pool.positions[rows, col_t0][None])
+                lineup = {"outfield": set(self.indices[rows[starters[0]]]), "captain": {self.indices[rows[captains[0]]]},
+                          "vice_captain": {self.indices[rows[vice_captains[0]]]}}
+            for idx in self.indices:
+                self.x_outfield[idx][t].setInitialValue(int(idx in lineup["outfield"]))
+                self.x_captain[idx][t].setInitialValue(int(idx in lineup["captain"]))
+                self.x_vice_captain[idx][t].setInitialValue(int(idx in lineup["vice_captain"]))
+                if self.decomposed:
+                    self.x_squad[idx][t].setInitialValue(int(idx in squads[t]))
+                else:
+                    self.x_bench[idx][t].setInitialValue(int(idx in squads[t] and idx not in lineup["outfield"]))
+                if t > self.start_t:
+                    self.y_transfer_in[idx][t].setInitialValue(int(idx in squads[t] and idx not in squads[t-1]))
+                    self.y_transfer_out[idx][t].setInitialValue(int(idx in squads[t-1] and idx not in squads[t]))
+            if not self.decomposed and t >= self.start_gameweek:
+                outfield_positions = self.player_data_df.loc[list(lineup["outfield"]), "position"].value_counts()
+                formation = [outfield_positions.get(pos, 0) for pos in ["DEF", "MID", "FWD"]]
+                for form_idx, form in self.FORMATIONS_DICT.items():
+                    self.formation_vars[form_idx][t].setInitialValue(int(form == formation))
+
+        for chip in self.chips:
+            for t in self.chip_gameweeks(chip):
+                self.z_chip[chip][t].setInitialValue(0)
+                for idx in self.x_chip.get(chip, []):
+                    self.x_chip[chip][idx][t].setInitialValue(0)
+
+        # The free and paid transfers follow from the squads.
+        if self.banked_transfers:
+            for t, (free_transfers, paid_transfers) in self.transfer_bank().items():
+                self.f_free_transfers[t].setInitialValue(free_transfers)
+                self.h_paid_transfers[t].setInitialValue(paid_transfers)
+
     def add_constraints(self) -> None:
         """Adds objective function and constraints to the LP problem."""
 
         # If existing team provided then define GW-1 constraints.
         if self.use_existing_team and self.existing_team:
             # Equality constraints (set team selection).
-            for idx in self.indices:
-                if idx in self.existing_team["outfield"]:
-                    self.prob += (self.x_outfield[idx][self.start_t] == 1, f"SetOutfieldValue_{idx}_GW{self.start_t}")
-                if idx in self.existing_team["bench"]:
-                    self.prob += (self.x_bench[idx][self.start_t] == 1, f"SetBenchValue_{idx}_GW{self.start_t}")
-                if idx in self.existing_team["captain"]:
-                    self.prob += (self.x_captain[idx][self.start_t] == 1, f"SetCaptainValue_{idx}_GW{self.start_t}")
-                if idx in self.existing_team["vice_captain"]:
-                    self.prob += (self.x_vice_captain[idx][self.start_t] == 1, f"SetViceCaptainValue_{idx}_GW{self.start_t}")
-            
+            self.existing_team_constraints = self.add_existing_team_constraints()
+
             # Inequality constraint - enforce team selection above.
             self.prob += pulp.lpSum([self.x_outfield[idx][self.start_t] for idx in self.indices]) == 11, f"OutfieldPlayersConstraint_GW{self.start_t}"
             self.prob += pulp.lpSum([self.x_bench[idx][self.start_t] for idx in self.indices]) == 4, f"BenchPlayersConstraint_GW{self.start_t}"
 
         # Base constraints
-        for t in range(self.start_gameweek, self.end_t):
-            self.prob += pulp.lpSum([self.estimated_costs_by_gw[t][idx] * (self.x_outfield[idx][t] + self.x_bench[idx][t]) for idx in self.indices]) <= self.t0_team_value + self.excess_budget, f"BudgetConstraint_GW{t}"            
-            self.prob += pulp.lpSum([self.mins_played[idx] * (self.x_outfield[idx][t] + self.x_bench[idx][t]) for idx in self.indices]) >= 15 * 70.0, f"ProbabilityOfStartingConstraint_GW{t}"
+        for j, t in enumerate(range(self.start_gameweek, self.end_t)):
+            self.prob += pulp.lpSum([self.estimated_costs_by_gw[i, j] * (self.x_outfield[idx][t] + self.x_bench[idx][t]) for i, idx in enumerate(self.indices)]) <= self.t0_team_value + self.excess_budget, f"BudgetConstraint_GW{t}"            
+            self.prob += pulp.lpSum([self.mins_played[i] * (self.x_outfield[idx][t] + self.x_bench[idx][t]) for i, idx in enumerate(self.indices)]) >= self.MIN_SQUAD_MINUTES, f"ProbabilityOfStartingConstraint_GW{t}"
             self.prob += pulp.lpSum([self.x_outfield[idx][t] for idx in self.indices]) == 11, f"OutfieldPlayersConstraint_GW{t}"
             self.prob += pulp.lpSum([self.x_bench[idx][t] for idx in self.indices]) == 4, f"BenchPlayersConstraint_GW{t}"
 
             for team in self.TEAMS:
-                self.prob += pulp.lpSum([self.x_outfield[idx][t] + self.x_bench[idx][t] for idx in self.team_groups[team]]) <= 3, f"{team}TeamConstraint_GW{t}"
+                self.prob += pulp.lpSum([self.x_outfield[idx][t] + self.x_bench[idx][t] for idx in self.team_groups[team]]) <= self.MAX_PER_TEAM, f"{team}TeamConstraint_GW{t}"
             
             for idx in self.indices:
+                if self.decomposed:
+                    # Single tightened constraint replaces the three captaincy constraints below.
+                    self.prob += self.x_captain[idx][t] + self.x_vice_captain[idx][t] <= self.x_outfield[idx][t], f"CaptainsInOutfield_GW{t}_{idx}"
+                    continue
                 self.prob += pulp.lpSum([self.x_outfield[idx][t] + self.x_bench[idx][t]]) <= 1, f"SingleSelectionConstraint_GW{t}_{idx}"
                 self.prob += self.x_captain[idx][t] <= self.x_outfield[idx][t], f"CaptainInOutfield_GW{t}_{idx}"
                 self.prob += self.x_vice_captain[idx][t] <= self.x_outfield[idx][t], f"ViceCaptainInOutfield_GW{t}_{idx}"
                 self.prob += self.x_captain[idx][t] + self.x_vice_captain[idx][t] <= 1, f"NotBothCaptainAndViceCaptain_GW{t}_{idx}"
-            
+
             self.prob += pulp.lpSum([self.x_captain[idx][t] for idx in self.indices]) == 1, f"OneCaptain_GW{t}"
-            self.prob += pulp.lpSum([self.x_vice_captain[idx][t] for idx in self.indices]) == 1, f"OneViceCaptain_GW{t}"    
-
-            self.prob += pulp.lpSum([self.formation_vars[idx][t] for idx in self.FORMATIONS_DICT]) == 1, f"OneFormation_GW{t}"
-            for form_idx, formation in self.FORMATIONS_DICT.items():
-                num_def, num_mid, num_fwd = formation
-                self.prob += pulp.lpSum([self.x_outfield[idx][t] for idx in self.position_groups["DEF"]]) >= num_def * self.formation_vars[form_idx][t], f"DefendersFormationOutfield_GW{t}_{form_idx}"
-                self.prob += pulp.lpSum([self.x_outfield[idx][t] for idx in self.position_groups["MID"]]) >= num_mid * self.formation_vars[form_idx][t], f"MidfieldersFormationOutfield_GW{t}_{form_idx}"
-                self.prob += pulp.lpSum([self.x_outfield[idx][t] for idx in self.position_groups["FWD"]]) >= num_fwd * self.formation_vars[form_idx][t], f"ForwardsFormationOutfield_GW{t}_{form_idx}"
-            
+            self.prob += pulp.lpSum([self.x_vice_captain[idx][t] for idx in self.indices]) == 1, f"OneViceCaptain_GW{t}"
+
+            if self.decomposed:
+                # Allowed formations are exactly the outfield counts between the smallest and largest
+                # formation values, the upper limits are implied by the 5-5-3 squad quotas.
+                num_def, num_mid, num_fwd = np.min(self.FORMATIONS, axis=0)
+                self.prob += pulp.lpSum([self.x_outfield[idx][t] for idx in self.position_groups["DEF"]]) >= num_def, f"DefendersFormationOutfield_GW{t}"
+                self.prob += pulp.lpSum([self.x_outfield[idx][t] for idx in self.position_groups["MID"]]) >= num_mid, f"MidfieldersFormationOutfield_GW{t}"
+                self.prob += pulp.lpSum([self.x_outfield[idx][t] for idx in self.position_groups["FWD"]]) >= num_fwd, f"ForwardsFormationOutfield_GW{t}"
+            else:
+                self.prob += pulp.lpSum([self.formation_vars[idx][t] for idx in self.FORMATIONS_DICT]) == 1, f"OneFormation_GW{t}"
+                for form_idx, formation in self.FORMATIONS_DICT.items():
+                    num_def, num_mid, num_fwd = formation
+                    self.prob += pulp.lpSum([self.x_outfield[idx][t] for idx in self.position_groups["DEF"]]) >= num_def * self.formation_vars[form_idx][t], f"DefendersFormationOutfield_GW{t}_{form_idx}"
+                    self.prob += pulp.lpSum([self.x_outfield[idx][t] for idx in self.position_groups["MID"]]) >= num_mid * self.formation_vars[form_idx][t], f"MidfieldersFormationOutfield_GW{t}_{form_idx}"
+                    self.prob += pulp.lpSum([self.x_outfield[idx][t] for idx in self.position_groups["FWD"]]) >= num_fwd * self.formation_vars[form_idx][t], f"ForwardsFormationOutfield_GW{t}_{form_idx}"
+
             self.prob += pulp.lpSum([self.x_outfield[idx][t] for idx in self.position_groups["GKP"]]) == 1, f"GoalkeeperFormationOutfield_GW{t}"
             self.prob += pulp.lpSum([self.x_bench[idx][t] for idx in self.position_groups["GKP"]]) == 1, f"GoalkeeperFormationBench_GW{t}"
             self.prob += pulp.lpSum([self.x_outfield[idx][t] + self.x_bench[idx][t] for idx in self.position_groups["DEF"]]) == 5, f"DefendersLineupHardConstraint_GW{t}"
             self.prob += pulp.lpSum([self.x_outfield[idx][t] + self.x_bench[idx][t] for idx in self.position_groups["MID"]]) == 5, f"MidfieldersLineupHardConstraint_GW{t}"
             self.prob += pulp.lpSum([self.x_outfield[idx][t] + self.x_bench[idx][t] for idx in self.position_groups["FWD"]]) == 3, f"ForwardsLineupHardConstraint_GW{t}"   
 
-            #self.prob += pulp.lpSum([self.estimated_costs_by_gw[t][idx] * self.x_bench[idx][t] for idx in self.position_groups["GKP"]]) <= 4.0, f"BenchGK_Cost4M_GW{t}"
+        # Decomposed mode: starters must be part of the squad, i.e. x_bench >= 0.
+        if self.decomposed:
+            for t in range(self.start_t, self.end_t):
+                for idx in self.indices:
+                    self.prob += self.x_outfield[idx][t] <= self.x_squad[idx][t], f"OutfieldInSquad_GW{t}_{idx}"
 
-        # Transfer constraints: At most one transfer in and out per gameweek
+        # Transfer constraints: At most one transfer in and out per gameweek, unlimited in a wildcard or free hit gameweek.
+        # With banked transfers up to max_transfers are allowed instead, see add_banked_transfer_constraints.
         for t in range(self.start_t + 1, self.end_t):
-            self.prob += pulp.lpSum([self.y_transfer_out[idx][t] for idx in self.indices]) <= 1, f"MaxOneTransferOut_GW{t}"
-            self.prob += pulp.lpSum([self.y_transfer_in[idx][t] for idx in self.indices]) <= 1, f"MaxOneTransferIn_GW{t}"
-            
+            unlimited = self.chip_indicator(self.TRANSFER_CHIPS, t)
+            if self.banked_transfers:
+                self.add_banked_transfer_constraints(t, unlimited)
+            else:
+                self.prob += pulp.lpSum([self.y_transfer_out[idx][t] for idx in self.indices]) <= 1 + 14 * unlimited, f"MaxOneTransferOut_GW{t}"
+                self.prob += pulp.lpSum([self.y_transfer_in[idx][t] for idx in self.indices]) <= 1 + 14 * unlimited, f"MaxOneTransferIn_GW{t}"
+
+            # After a free hit gameweek transfers are made relative to the squad held before it.
+            free_hit = self.chip_indicator(["free_hit"], t-1)
             for idx in self.indices:
-                self.prob += self.y_transfer_out[idx][t] >= self.x_outfield[idx][t-1] + self.x_bench[idx][t-1] - self.x_outfield[idx][t] - self.x_bench[idx][t], f"TransferOutConsistency_GW{t}_{idx}"
-                self.prob += self.y_transfer_in[idx][t] >= self.x_outfield[idx][t] + self.x_bench[idx][t] - self.x_outfield[idx][t-1] - self.x_bench[idx][t-1], f"TransferInConsistency_GW{t}_{idx}" 
-    
+                self.prob += self.y_transfer_out[idx][t] >= self.x_outfield[idx][t-1] + self.x_bench[idx][t-1] - self.x_outfield[idx][t] - self.x_bench[idx][t] - free_hit, f"TransferOutConsistency_GW{t}_{idx}"
+                self.prob += self.y_transfer_in[idx][t] >= self.x_outfield[idx][t] + self.x_bench[idx][t] - self.x_outfield[idx][t-1] - self.x_bench[idx][t-1] - free_hit, f"TransferInConsistency_GW{t}_{idx}"
+                if "free_hit" in self.chips and t-1 in self.chip_gameweeks("free_hit"):
+                    self.prob += self.y_transfer_out[idx][t] >= self.x_outfield[idx][t-2] + self.x_bench[idx][t-2] - self.x_outfield[idx][t] - self.x_bench[idx][t] - (1 - free_hit), f"FreeHitTransferOutConsistency_GW{t}_{idx}"
+                    self.prob += self.y_transfer_in[idx][t] >= self.x_outfield[idx][t] + self.x_bench[idx][t] - self.x_outfield[idx][t-2] - self.x_bench[idx][t-2] - (1 - free_hit), f"FreeHitTransferInConsistency_GW{t}_{idx}"
+
+        if self.chips:
+            self.add_chip_constraints()
+
+    def add_banked_transfer_constraints(self, t: int, unlimited: pulp.LpAffineExpression) -> None:
+        """
+        Adds the banked transfer constraints for gameweek t, given the indicator of a transfer chip played in it.
+        Transfers beyond the free transfers are paid (none in a transfer chip gameweek), and each gameweek adds a free
+        transfer to those left unused, up to max_free_transfers. A transfer chip keeps the bank but adds none.
+        Free transfers are only bounded above, the objective keeps as many as the bank allows.
+        """
+        transfers = pulp.lpSum([self.y_transfer_in[idx][t] for idx in self.indices])
+        max_transfers = self.max_transfers + (self.SQUAD_SIZE - self.max_transfers) * unlimited
+        self.prob += pulp.lpSum([self.y_transfer_out[idx][t] for idx in self.indices]) <= max_transfers, f"MaxTransfersOut_GW{t}"
+        self.prob += transfers <= max_transfers, f"MaxTransfersIn_GW{t}"
+        self.prob += self.h_paid_transfers[t] >= transfers - self.f_free_transfers[t] - self.SQUAD_SIZE * unlimited, f"PaidTransfers_GW{t}"
+        self.prob += self.h_paid_transfers[t] <= transfers, f"PaidTransfersMade_GW{t}"
+        if t + 1 < self.end_t:
+            self.prob += self.f_free_transfers[t+1] <= self.f_free_transfers[t] - transfers + self.h_paid_transfers[t] + 1 + self.SQUAD_SIZE * unlimited, f"FreeTransferBank_GW{t}"
+            if len(unlimited):
+                self.prob += self.f_free_transfers[t+1] <= self.f_free_transfers[t] + 1 - unlimited, f"FreeTransferBankChip_GW{t}"
+
+    def transfer_bank(self) -> dict:
+        """
+        Returns the free and paid transfers of each gameweek with transfers in the current solution, replaying the bank
+        from the chosen squads (the free transfer variables are only bounded above, so may understate the bank).
+        """
+        squads = {t: {idx for idx in self.indices if round(pulp.value(self.x_outfield[idx][t] + self.x_bench[idx][t])) == 1} for t in range(self.start_t, self.end_t)}
+        placement = self.chip_placement()
+        bank, free_transfers = {}, self.free_transfers
+        for t in range(self.start_t + 1, self.end_t):
+            transfers = len(squads[t] - squads[t - 2 if placement.get("free_hit") == t - 1 else t - 1])
+            chip = any(placement.get(chip) == t for chip in self.TRANSFER_CHIPS)
+            paid_transfers = 0 if chip else max(transfers - free_transfers, 0)
+            bank[t] = (free_transfers, paid_transfers)
+            free_transfers = free_transfers if chip else min(free_transfers - transfers + paid_transfers + 1, self.max_free_transfers)
+        return bank
+
+    def add_chip_constraints(self) -> None:
+        """Adds the chip usage constraints and bounds the points gained by bench boost and triple captain."""
+        for chip in self.chips:
+            self.prob += pulp.lpSum(self.z_chip[chip].values()) <= 1, f"SingleChipUse_{chip}"
+
+        for j, t in enumerate(range(self.start_gameweek, self.end_t)):
+            if len(self.chip_indicator(self.chips, t)) > 1:
+                self.prob += self.chip_indicator(self.chips, t) <= 1, f"SingleChipPerGameweek_GW{t}"
+
+            # Boosted players must be benched (or captain) and are limited by whether the chip is played. Linking each
+            # player rather than the total gain keeps the LP relaxation tight, which the chip planner's bounds rely on.
+            if "bench_boost" in self.chips:
+                self.prob += pulp.lpSum([self.x_chip["bench_boost"][idx][t] for idx in self.indices]) <= 4 * self.z_chip["bench_boost"][t], f"BenchBoostPlayed_GW{t}"
+                for idx in self.indices:
+                    self.prob += self.x_chip["bench_boost"][idx][t] <= self.x_bench[idx][t], f"BenchBoostOnBench_GW{t}_{idx}"
+            if "triple_captain" in self.chips:
+                self.prob += pulp.lpSum([self.x_chip["triple_captain"][idx][t] for idx in self.indices]) <= self.z_chip["triple_captain"][t], f"TripleCaptainPlayed_GW{t}"
+                for idx in self.indices:
+                    self.prob += self.x_chip["triple_captain"][idx][t] <= self.x_captain[idx][t], f"TripleCaptainIsCaptain_GW{t}_{idx}"
+
 
-    def extract_results(self) -> pd.DataFrame:
+    def assign_lineups(self) -> float:
+        """
+        Computes the starting XI, bench, captain and vice-captain of each solved squad in closed form and
+        writes them to the lineup decision variables. Returns the objective value of the resulting plan.
+        """
+        # Squads as (gameweeks x 15) arrays of player rows.
+        squads = np.array([[i for i, idx in enumerate(self.indices) if round(pulp.value(self.x_squad[idx][t])) == 1] for t in range(self.start_gameweek, self.end_t)])
+        rows = np.arange(len(squads))
+        positions = self.player_pool.positions[squads, self.player_pool.column(self.start_gameweek)]
+        chip_bench_weights, captain_multipliers = self.chip_multipliers(self.chip_placement())
+        bench_weights = chip_bench_weights[squads, rows[:, None]]
+        points = self.pts_by_gw[squads, rows[:, None]]
+        # In a bench boost gameweek every lineup scores the same before captaincy, so the highest scorers are started.
+        gains = np.where(bench_weights == 1, points, points * (1 - bench_weights))
+        starters, captains, vice_captains = best_lineups(points, gains, positions)
+
+        # Objective value for the closed-form lineups, matching objective_function().
+        objective = (points * np.where(starters, 1, bench_weights)).sum() + (captain_multipliers * points[rows, captains]).sum() + 0.1 * points[rows, vice_captains].sum() - pulp.value(self.hit_costs())
+
+        # Write the lineups back so the solved variables describe an integral team selection (x_bench follows from x_squad).
+        for t in range(self.start_t, self.end_t):
+            for idx in self.indices:
+                for var in (self.x_squad[idx][t], self.x_outfield[idx][t], self.x_captain[idx][t], self.x_vice_captain[idx][t]):
+                    var.varValue = round(var.varValue or 0) if t < self.start_gameweek else 0
+            if t < self.start_gameweek:
+                continue  # Existing team gameweek is fixed by constraints.
+            j = t - self.start_gameweek
+            for slot, i in enumerate(squads[j]):
+                self.x_squad[self.indices[i]][t].varValue = 1
+                self.x_outfield[self.indices[i]][t].varValue = int(starters[j, slot])
+            self.x_captain[self.indices[squads[j, captains[j]]]][t].varValue = 1
+            self.x_vice_captain[self.indices[squads[j, vice_captains[j]]]][t].varValue = 1
+
+        # Boosted players follow from the lineups.
+        placement = self.chip_placement()
+        for chip in self.x_chip:
+            for idx in self.indices:
+                for t in self.chip_gameweeks(chip):
+                    boosted = self.x_bench[idx][t] if chip == "bench_boost" else self.x_captain[idx][t]
+                    self.x_chip[chip][idx][t].varValue = round(pulp.value(boosted)) if t == placement[chip] else 0
+
+        return objective
+
+    def extract_results(self, validation: bool = None) -> pd.DataFrame:
         """Extracts the solution and constructs a results dataframe representing the optimal team selection,
-           which is assigned as an attribute of the class object.
+           which is assigned as an attribute of the class object. The validation report defaults to self.validation.
         """
+        validation = self.validation if validation is None else validation
 
         results_df = pd.DataFrame()
+        bank = self.transfer_bank() if self.banked_transfers else {}
         for t in range(self.start_t, self.end_t):
             outfield_indices = [idx for idx in self.indices if pulp.value(self.x_outfield[idx][t]) == 1]
             bench_indices = [idx for idx in self.indices if pulp.value(self.x_bench[idx][t]) == 1]
@@ -222,9 +785,16 @@ class MILPOptimiser:
                 self.player_data_df.loc[bench_indices, :].assign(position_type='Bench')
             ])
             
+            # Add estimated player costs (the existing team gameweek uses the first forecast gameweek's costs).
+            solution_df[f"ep_cost_gw{t}"] = self.estimated_costs_by_gw[self.indices.get_indexer(solution_df.index), max(t - self.start_gameweek, 0)]
+
             # Add captain and vice-captain info
             solution_df["captain"] = solution_df.index.isin(captain_indices)
             solution_df["vice_captain"] = solution_df.index.isin(vice_captain_indices)
+            if self.chips:
+                solution_df["chip"] = next((chip for chip, gameweek in self.chip_placement().items() if gameweek == t), None)
+            if self.banked_transfers:
+                solution_df["free_transfers"], solution_df["paid_transfers"] = bank.get(t, (None, None))
 
             # Define sorting variables
             solution_df["pos_rank"] = solution_df["position"].map(dict(zip(self.POSITIONS, range(0, len(self.POSITIONS)))))
@@ -235,17 +805,17 @@ class MILPOptimiser:
             solution_df["gameweek"] = t
             
             if self.use_existing_team:
-                solution_df[f"ep_cost_gw{self.start_t}"] = solution_df[f"ep_cost_gw{self.start_t + 1}"]
                 solution_df[f"ep_gw{self.start_t}"] = solution_df[f"ep_gw{self.start_t + 1}"]
             
             solution_df = solution_df[["id", "name", "position", "team", "prob_injury", "starts", "starts_perc",
                                        "selected_by_percent", "xmins", f"ep_cost_gw{t}", "gameweek",
-                                       f"ep_gw{t}", "position_type", "captain", "vice_captain"]]
+                                       f"ep_gw{t}", "position_type", "captain", "vice_captain"] + (["chip"] if self.chips else []) +
+                                      (["free_transfers", "paid_transfers"] if self.banked_transfers else [])]
             solution_df.rename(columns={f"ep_gw{t}":"xPts", f"ep_cost_gw{t}": "player_cost", "xmins":"xMins"}, inplace=True)
             results_df = pd.concat([results_df, solution_df], axis=0)
 
             # Do not print validation report for first period if the solver is run with an existing team.
-            if self.validation and not(self.use_existing_team and t == self.start_t):
+            if validation and not(self.use_existing_team and t == self.start_t):
                 xPts_total_incl_cap = np.where(solution_df["position_type"] == "Outfield", 
                                             np.where(solution_df["captain"] == True,
                                                         2 * solution_df["xPts"],
@@ -265,7 +835,7 @@ class MILPOptimiser:
                 players_promoted = (bench_players_prev & outfield_players_curr) - (players_trns_out | players_trns_in)
 
                 print(f"Gameweek {t}:") 
-                print(f"{pulp.LpStatus[self.prob.status]} team:\n{solution_df}\n")
+                print(f"{'Best found' if self.prob.sol_status == pulp.LpSolutionIntegerFeasible else pulp.LpStatus[self.prob.status]} team:\n{solution_df}\n")
                 print(f"Formation: {formation_stats['DEF']},{formation_stats['MID']},{formation_stats['FWD']}")
                 print(f"Total team cost: {solution_df['player_cost'].sum()}")
                 print(f"   (o/w Outfield): {solution_df[solution_df['position_type'] == 'Outfield']['player_cost'].sum()}")
@@ -274,6 +844,11 @@ class MILPOptimiser:
                 print(f"Total expected points (incl. Captain): {xPts_total_incl_cap}")
                 print(f"Captain: {solution_df[solution_df['captain'] == True]['name'].values[0]}")
                 print(f"Vice-Captain: {solution_df[solution_df['vice_captain'] == True]['name'].values[0]}")
+                if self.chips:
+                    print(f"Chip: {solution_df['chip'].iloc[0] or 'N/A'}")
+                if t in bank:
+                    paid_transfers = solution_df['paid_transfers'].iloc[0]
+                    print(f"Free transfers: {solution_df['free_transfers'].iloc[0]}, paid transfers: {paid_transfers} (-{paid_transfers * self.hit_cost} pts)")
                 print(f"Transfered out: {'N/A' if t == (not self.use_existing_team and self.start_gameweek) else ''.join(players_trns_out)}")
                 print(f"Transferred in: {'N/A' if t == (not self.use_existing_team and self.start_gameweek) else ''.join(players_trns_in)}")
                 print(f"Players benched: {'N/A' if t == (not self.use_existing_team and self.start_gameweek) else ', '.join(players_benched)}")
@@ -281,21 +856,361 @@ class MILPOptimiser:
         
         self.results_df = results_df
 
-    def calulate_optimal_team(self) -> None:
+    def solve(self, solver: pulp.LpSolver = None) -> None:
+        """Solves the LP problem, by default using CBC. In decomposed mode the closed-form lineups are assigned after solving."""
+        solver = solver or pulp.PULP_CBC_CMD(msg=False)
+        self.prob.solve(solver)
+
+        if self.decomposed and self.prob.status == pulp.LpStatusOptimal:
+            # The relaxed lineups are an upper bound on the value of the chosen squads, the plan is optimal when the
+            # closed-form lineups attain it. Otherwise enforce integral lineups and re-solve, restoring the relaxed
+            # categories afterwards so the model can be reused for further solves.
+            if pulp.value(self.prob.objective) - self.assign_lineups() > 1e-6:
+                relaxed = [var for variables in (self.x_outfield, self.x_captain, self.x_vice_captain, self.y_transfer_in, self.y_transfer_out)
+                           for by_gw in variables.values() for var in by_gw.values()]
+                for var in relaxed:
+                    var.cat = pulp.LpInteger
+                self.prob.solve(solver)
+                if self.prob.status == pulp.LpStatusOptimal:
+                    self.assign_lineups()
+                for var in relaxed:
+                    var.cat = pulp.LpContinuous
+
+    def solve_from_held_squad(self, solver: pulp.LpSolver, tolerance: float = 1e-6) -> None:
+        """Solves the LP problem cut off at the held squad's objective (see held_squad), keeping the held squad should CBC find no better team."""
+        start_time = time.time()
+        if not self.set_held_squad():
+            self.solve(solver)
+            return
+        objective, held_values = pulp.value(self.prob.objective), {var.name: var.varValue for var in self.prob.variables()}
+
+        # The time limit includes the held squad, as in solve_incumbents.
+        options, time_limit = solver.options, solver.timeLimit
+        solver.options = options + [f"cutoff {-(objective + tolerance)}"]
+        if time_limit is not None:
+            solver.timeLimit = max(time_limit - (time.time() - start_time), 1.0)
+        try:
+            self.solve(solver)
+        finally:
+            solver.options, solver.timeLimit = options, time_limit
+
+        # Infeasible under the cutoff proves the held squad optimal, a solve stopped without a team leaves it unproven.
+        if self.prob.status == pulp.LpStatusInfeasible or self.prob.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+            proven = self.prob.status == pulp.LpStatusInfeasible
+            for var in self.prob.variables():
+                var.varValue = held_values[var.name]
+            self.prob.assignStatus(*((pulp.LpStatusOptimal, pulp.LpSolutionOptimal) if proven else (pulp.LpStatusNotSolved, pulp.LpSolutionIntegerFeasible)))
+
+    @staticmethod
+    def constraint_group(name: str) -> str:
+        """Returns the name of a constraint with any player or formation index removed, e.g. SetBenchValue_GW22."""
+        return re.sub(r"^(\w+?)_(?:[^_]+_)?(GW\d+).*$", r"\1_\2", name)
+
+    def diagnose_infeasibility(self, time_limit: float = 10.0) -> list:
+        """
+        Returns the names of a minimal set of conflicting constraint groups in an infeasible LP problem (e.g.
+        BudgetConstraint_GW24), found with a deletion filter over gameweeks, then families, then single groups.
+        """
+        start_time = time.time()
+        constraints, objective = self.prob.constraints, self.prob.objective
+        groups = {}
+        for name in constraints:
+            groups.setdefault(self.constraint_group(name), []).append(name)
+
+        levels = [lambda group: re.findall(r"_GW(\d+)", group),
+                  lambda group: re.sub(r"^[A-Z]{3}(?=TeamConstraint)", "", group.split("_GW")[0]),
+                  lambda group: group]
+
+        def infeasible(parts: list) -> bool:
+            if not parts:
+                return False  # Variable bounds alone are always feasible (and CBC rejects a problem without rows).
+            self.prob.constraints = {name: constraints[name] for part in parts for group in part for name in groups[group]}
+            self.prob.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit))
+            return self.prob.status == pulp.LpStatusInfeasible
+
+        try:
+            # Feasibility problems only, every variable is kept as a column even when no remaining constraint uses it.
+            self.prob.objective = pulp.LpAffineExpression([(var, 0) for var in self.prob.variables()])
+            conflicts = [list(groups)]
+            for level in levels:
+                parts = {}
+                for group in (group for part in conflicts for group in part):
+                    parts.setdefault(str(level(group)), []).append(group)
+                if len(parts) == len(conflicts):
+                    continue  # The same parts as the previous level, already filtered.
+                conflicts = list(parts.values())
+                for part in list(conflicts):
+                    remaining = [other for other in conflicts if other is not part]
+                    if infeasible(remaining):
+                        conflicts = remaining
+        finally:
+            self.prob.constraints, self.prob.objective = constraints, objective
+            self.prob.status = pulp.LpStatusInfeasible
+
+        conflicts = [group for part in conflicts for group in part]
+        print(f"Found {len(conflicts)} conflicting constraint groups in {round(time.time() - start_time, 2)} seconds: {', '.join(conflicts)}")
+        return conflicts
+
+    def iterate_incumbents(self, time_limit: float = None, gap: float = 0.0, tolerance: float = 1e-6) -> Iterator[dict]:
+        """
+        Solves the LP problem in a background thread, yielding the held squad (see held_squad) and then each improving
+        objective or bound CBC logs, as dicts of results_df (None until CBC stops), objective, bound, gap, elapsed and optimal.
+        Closing the iterator interrupts CBC, leaving the best team found in the decision variables.
+        """
+        incumbents = queue.Queue()
+        fd, log_path = tempfile.mkstemp(suffix="-cbc.log")
+        os.close(fd)
+        solver = _InterruptibleCBC(msg=False, timeLimit=time_limit, gapRel=gap or None, logPath=log_path)
+        thread = threading.Thread(target=self.solve_incumbents, args=(incumbents, solver, tolerance), daemon=True)
+        thread.start()
+        try:
+            while True:
+                incumbent = incumbents.get()
+                if incumbent is None:
+                    break
+                if isinstance(incumbent, Exception):
+                    raise incumbent
+                yield incumbent
+        finally:
+            solver.interrupt()
+            thread.join()
+            os.remove(log_path)
+
+    def solve_incumbents(self, incumbents: queue.Queue, solver: _InterruptibleCBC, tolerance: float) -> None:
+        """Runs the solve for iterate_incumbents, putting each improving incumbent on the queue followed by None."""
+        start_time = time.time()
+        objective, bound, best_values, status = -np.inf, np.inf, None, (pulp.LpStatusNotSolved, pulp.LpSolutionNoSolutionFound)
+        sense = -1 if self.prob.sense == pulp.LpMaximize else 1  # CBC logs objective values in the minimisation sense.
+
+        def put_incumbent(results_df: pd.DataFrame, proven: bool) -> None:
+            incumbents.put({"results_df": results_df, "objective": objective, "bound": max(bound, objective),
+                            "gap": (max(bound, objective) - objective) / max(abs(objective), 1e-10), "elapsed": time.time() - start_time, "optimal": proven})
+
+        def read_progress(line: str) -> None:
+            # e.g. "Cbc0004I Integer solution of -214.64 found after 1020 iterations and 25 nodes (7.26 seconds)" or
+            # "Cbc0010I After 0 nodes, 1 on tree, 1e+50 best solution, best possible -216.26448 (5.41 seconds)"
+            nonlocal objective, bound
+            number = r"(-?[\d.]+(?:e[+-]?\d+)?)"
+            solution, possible = re.search(r"Integer solution of " + number, line), re.search(r"best possible " + number, line)
+            improved = False
+            if solution and sense * float(solution.group(1)) > objective + tolerance:
+                objective, improved = sense * float(solution.group(1)), True
+            if possible and abs(float(possible.group(1))) < 1e50 and sense * float(possible.group(1)) < bound - tolerance:
+                bound, improved = sense * float(possible.group(1)), True
+            if improved and objective > -np.inf:
+                put_incumbent(None, False)
+
+        try:
+            if self.set_held_squad():
+                objective, best_values = pulp.value(self.prob.objective), {var.name: var.varValue for var in self.prob.variables()}
+                status = (pulp.LpStatusNotSolved, pulp.LpSolutionIntegerFeasible)
+                self.extract_results(validation=False)
+                put_incumbent(self.results_df, False)
+
+            # The time limit runs from the start, including the held squad. Its objective is passed as a cutoff (CBC searches
+            # more slowly warm-started from it), so an infeasible solve proves the held squad optimal.
+            if solver.timeLimit is not None:
+                solver.timeLimit = max(solver.timeLimit - (time.time() - start_time), 1.0)
+            if best_values is not None:
+                solver.options = solver.options + [f"cutoff {-(objective + tolerance) if self.prob.sense == pulp.LpMaximize else objective - tolerance}"]
+            solver.progress = read_progress
+            self.solve(solver)
+            if self.prob.status == pulp.LpStatusInfeasible and best_values is not None:
+                for var in self.prob.variables():
+                    var.varValue = best_values[var.name]
+                bound, status = objective, (pulp.LpStatusOptimal, pulp.LpSolutionOptimal)
+                self.prob.assignStatus(*status)
+                self.extract_results(validation=False)
+                put_incumbent(self.results_df, True)
+            elif self.prob.status not in (pulp.LpStatusOptimal, pulp.LpStatusNotSolved):
+                status = (self.prob.status, self.prob.sol_status)
+                raise RuntimeError(f"Error: Optimisation is {pulp.LpStatus[self.prob.status]}!")
+            elif self.prob.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+                # The bound is the tightest reported by CBC when stopped early, or the objective once proven optimal.
+                with open(solver.optionsDict["logPath"], "r") as file:
+                    bounds = re.findall(r"^Upper bound:\s+(\S+)", file.read(), flags=re.MULTILINE)
+                objective = pulp.value(self.prob.objective)
+                bound = objective if self.prob.sol_status == pulp.LpSolutionOptimal else min(float(bounds[-1]), bound) if bounds else bound
+                proven = bound - objective <= tolerance
+                status = (pulp.LpStatusOptimal, pulp.LpSolutionOptimal) if proven else (pulp.LpStatusNotSolved, pulp.LpSolutionIntegerFeasible)
+                best_values = {var.name: var.varValue for var in self.prob.variables()}
+                self.prob.assignStatus(*status)
+                self.extract_results(validation=False)
+                put_incumbent(self.results_df, proven)
+        except Exception as error:
+            incumbents.put(error)
+        finally:
+            # Leave the best incumbent in the decision variables, only proven optimal teams hold an optimal status.
+            if best_values is not None:
+                for var in self.prob.variables():
+                    var.varValue = best_values[var.name]
+            self.prob.assignStatus(*status)
+            incumbents.put(None)
+
+    def build_problem(self) -> None:
+        """Screens the inputs, raising a ValueError describing any that make the LP problem infeasible, then builds it."""
+        issues = self.screen_feasibility()
+        if issues:
+            raise ValueError("Error: No feasible team exists for these inputs!\n" + "\n".join(f"  - {issue}" for issue in issues))
+        self.initialise_optimisation()  # Create an LP problem and initialise key decision variables.
+        self.add_constraints()  # Add objective function and constraint terms to the linear programming problem.
+
+    def calulate_optimal_team(self, callback: Callable = None, time_limit: float = None) -> None:
         """ 
         Formulates and solves an LP problem that will calculate the optimal FPL team for a given gameweek, 
         based on a DataFrame including all FPL players for a given gameweek and a forecast of their projected
-        points (xPts).
+        points (xPts). Given a callback, the solve runs in anytime mode: each improving incumbent from
+        iterate_incumbents is passed to the callback, which returns True to stop early with the best team so far.
+        Inputs are screened before the problem is built, raising a ValueError describing any that make it infeasible.
+        Should the solver still report the problem infeasible, a RuntimeError names a minimal conflicting set of
+        constraint groups found by diagnose_infeasibility.
         """
         start_time = time.time()
         print(f"Calculating a {self.gameweeks}-gameweek forecast, starting from GW: {self.start_gameweek}...")
-        self.initialise_optimisation()  # Create an LP problem and initialise key decision variables.
-        self.add_constraints()  # Add objective function and constraint terms to the linear programming problem.
+        self.build_problem()
 
         # Solve the LP problem.
-        self.prob.solve(pulp.PULP_CBC_CMD(msg=False))
-       
+        if callback is None and self.banked_transfers:
+            self.solve_from_held_squad(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit))  # Banked transfers search far more slowly uncut.
+        elif callback is None:
+            self.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit))
+        else:
+            incumbents = self.iterate_incumbents(time_limit=time_limit)
+            try:
+                for incumbent in incumbents:
+                    if callback(incumbent):
+                        break
+            except RuntimeError:
+                if self.prob.status != pulp.LpStatusInfeasible:
+                    raise
+            finally:
+                incumbents.close()  # Interrupts the background solve and waits for its incumbent.
+
+        if self.prob.status == pulp.LpStatusInfeasible:
+            raise RuntimeError(f"Error: Optimisation is Infeasible, conflicting constraints: {', '.join(self.diagnose_infeasibility())}!")
+        if self.prob.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+            raise RuntimeError("Error: No feasible team found within the time limit!")
+
         # Extract results.
         self.extract_results()
         print("Optimisation process complete!")
-        print(f"Time taken: {round(time.time() - start_time, 2)} seconds")
\ No newline at end of file
+        print(f"Time taken: {round(time.time() - start_time, 2)} seconds")
+
+    def secondary_objective(self, secondary: str) -> pulp.LpAffineExpression:
+        """
+        Returns a secondary objective for pareto_frontier over the squads of the forecast gameweeks: "injury" the summed
+        injury probability, "variance" the summed points variance and "value" the squad value in the last gameweek.
+        Each player's points are modelled as appearing with probability p = (1 - prob_injury) * min(xMins / 90, 1) and
+        then scoring Poisson points with mean xPts / p, giving a variance of xPts + (1 - p) * xPts ** 2 / p.
+        Objectives are defined on the squad rather than the lineup so that they also hold in decomposed mode.
+        """
+        gameweeks = list(enumerate(range(self.start_gameweek, self.end_t)))
+        if secondary == "value":
+            j, t = gameweeks[-1]
+            return pulp.lpSum([self.estimated_costs_by_gw[i, j] * (self.x_outfield[idx][t] + self.x_bench[idx][t]) for i, idx in enumerate(self.indices)])
+
+        prob_injury = self.player_data_df.loc[self.indices, "prob_injury"].fillna(0).to_numpy()
+        if secondary == "injury":
+            weights = np.repeat(prob_injury[:, None], len(gameweeks), axis=1)
+        else:
+            prob_appear = np.maximum((1 - prob_injury) * np.clip(self.mins_played / 90.0, 0, 1), 1e-6)[:, None]
+            points = np.maximum(self.pts_by_gw, 0)
+            weights = points + (1 - prob_appear) * points ** 2 / prob_appear
+        return pulp.lpSum([weights[i, j] * (self.x_outfield[idx][t] + self.x_bench[idx][t])
+                           for i, idx in enumerate(self.indices) for j, t in gameweeks if weights[i, j] != 0])
+
+    def pareto_frontier(self, secondary: str = "injury", points: int = 20, time_limit: float = None, gap_rel: float = 0.0, tolerance: float = 1e-6) -> pd.DataFrame:
+        """
+        Traces the non-dominated frontier between expected points and a secondary objective (see secondary_objective) with
+        an epsilon-constraint, the points between the ends solved to gap_rel. Returns the squads of every frontier point as
+        one results DataFrame, storing a summary with CBC's bound and gap on expected points for each point as frontier_df.
+        """
+        start_time = time.time()
+        if secondary not in self.FRONTIER_OBJECTIVES:
+            raise ValueError(f"Error: Unknown secondary objective {secondary}, expected one of {list(self.FRONTIER_OBJECTIVES)}!")
+        if not hasattr(self, "prob"):
+            self.build_problem()
+        expression = self.secondary_objective(secondary)
+        sign = 1 if self.FRONTIER_OBJECTIVES[secondary] == pulp.LpMaximize else -1  # The frontier maximises sign * secondary.
+        objective, sense = self.prob.objective, self.prob.sense
+
+        def solve(solve_problem: Callable, gap: float = None, options: list = None) -> float:
+            """Solves the LP problem, returning the bound CBC reports (the objective once proven optimal, nan if not logged)."""
+            fd, log_path = tempfile.mkstemp(suffix="-cbc.log")
+            os.close(fd)
+            try:
+                solve_problem(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, gapRel=gap or None, options=options or [], logPath=log_path))
+                with open(log_path, "r") as file:
+                    log = file.read()
+            finally:
+                os.remove(log_path)
+            if self.prob.status != pulp.LpStatusOptimal:
+                raise RuntimeError(f"Error: Optimisation is {pulp.LpStatus[self.prob.status]}!")
+            bounds = re.findall(r"^(?:Upper|Lower) bound:\s+(\S+)", log, flags=re.MULTILINE)
+            return float(bounds[-1]) if bounds else pulp.value(self.prob.objective) if "Optimal solution found" in log else np.nan
+
+        candidates = []
+        def add_candidate(solve_start: float, bound: float) -> None:
+            # The bound is on expected points, unknown (nan) for the secondary end.
+            self.extract_results(validation=False)
+            value = pulp.value(self.prob.objective)
+            candidates.append({"objective": value, secondary: pulp.value(expression), "bound": bound,
+                               "gap": (bound - value) / max(abs(value), 1e-10), "solve_time": time.time() - solve_start, "results_df": self.results_df})
+
+        # The points optimum, then the best secondary value with ties broken on points. The secondary is optimised in
+        # its own sense and cut off at the points optimum's value (CBC's cutoff is in the minimisation sense), which
+        # prunes the many squads tied on the secondary (e.g. of players who do not play). Maximising points at exactly
+        # the best secondary value instead is by far the slowest solve.
+        solve_start = time.time()
+        bound = solve(self.solve)
+        points_values = {var.name: var.varValue for var in self.prob.variables()}
+        points_end = pulp.value(sign * expression)
+        add_candidate(solve_start, bound)
+
+        solve_start = time.time()
+        self.prob.objective, self.prob.sense = expression + sign * self.FRONTIER_TIE_BREAK * objective, self.FRONTIER_OBJECTIVES[secondary]
+        try:
+            solve(self.prob.solve, options=[f"cutoff {-sign * pulp.value(self.prob.objective) + tolerance}"])
+            if self.decomposed:
+                self.assign_lineups()
+        finally:
+            self.prob.objective, self.prob.sense = objective, sense
+        secondary_end = pulp.value(sign * expression)
+
+        # Only one point when the points optimum is also best on the secondary.
+        levels = np.linspace(points_end, secondary_end, max(points, 2)) if secondary_end - points_end > tolerance else [points_end]
+        print(f"Tracing a {len(levels)}-point frontier of expected points against {secondary} from {round(sign * secondary_end, 3)} to {round(sign * points_end, 3)}...")
+        if len(levels) > 1:
+            add_candidate(solve_start, np.nan)
+
+        # Each tighter step only removes squads, so a squad meeting it remains the best found for it.
+        for var in self.prob.variables():
+            var.varValue = points_values[var.name]
+        self.prob += sign * expression >= points_end, "ParetoEpsilonConstraint"
+        try:
+            for level in levels[1:-1]:
+                if pulp.value(sign * expression) >= level - tolerance:
+                    continue
+                solve_start = time.time()
+                self.prob.constraints["ParetoEpsilonConstraint"].constant = -(level - tolerance)
+                add_candidate(solve_start, solve(self.solve, gap_rel))
+        finally:
+            self.remove_constraints(["ParetoEpsilonConstraint"])
+            for var in self.prob.variables():
+                var.varValue = points_values[var.name]
+            self.prob.status = pulp.LpStatusOptimal
+            self.results_df = candidates[0]["results_df"]
+
+        # Points not gaining expected points on a point at least as good on the secondary are dominated, which inner
+        # points solved to a gap can be.
+        frontier = []
+        for point in sorted(candidates, key=lambda point: (-sign * point[secondary], -point["objective"])):
+            if not frontier or point["objective"] > frontier[-1]["objective"] + tolerance:
+                frontier.append(point)
+        squads = [point.pop("results_df") for point in frontier]
+
+        self.frontier_df = pd.DataFrame(frontier)
+        self.frontier_df.insert(0, "frontier_point", range(len(frontier)))
+        print(f"Found {len(frontier)} frontier points in {round(time.time() - start_time, 2)} seconds:\n{self.frontier_df}")
+        return pd.concat([squad_df.assign(frontier_point=k, objective=point["objective"], **{secondary: point[secondary]})
+                          for k, (squad_df, point) in enumerate(zip(squads, frontier))], ignore_index=True)
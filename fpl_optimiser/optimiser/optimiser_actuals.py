@@ -5,6 +5,7 @@ import time
 import os
 
 from ..utils import DATA_DIR
+from ..data import PlayerPool
 
 class MILPActualsOptimiser:
     """
@@ -29,12 +30,12 @@ class MILPActualsOptimiser:
                  bench_weight: float = 0.5,
                  gkp_bench_weight: float = 0.1,                
                  validation: bool = True,
-                 use_existing_team: bool = False) -> None:
+                 use_existing_team: bool = False,
+                 player_pool: PlayerPool = None) -> None:
         
         # Understand the data being fed in - if gw field exceeds self.gameweeks raise error.
         # Set attributes.
         self.player_data_df = player_data_df
-        self.indices = player_data_df.index
         self.start_gameweek = start_gameweek
         self.gameweeks = gameweeks
         self.bench_weight = bench_weight
@@ -64,11 +65,23 @@ class MILPActualsOptimiser:
             # Different start and end points for temporal constraints.
             self.start_t, self.end_t = start_gameweek, start_gameweek + gameweeks
         
-        self.position_groups = {pos: {t: set(player_data_df[player_data_df[f"position_gw{t}"] == pos].index) for t in range(self.start_gameweek, self.end_t)} for pos in self.POSITIONS}
-        self.team_groups = {team: {t: set(player_data_df[player_data_df[f"team_gw{t}"] == team].index) for t in range(self.start_gameweek, self.end_t)} for team in self.TEAMS}
-        self.pts_by_gw = {t: dict(zip(self.indices, list(np.array(self.player_data_df[f"ep_gw{t}"])))) for t in range(self.start_gameweek, self.end_t)}
-        self.mins_played = {t: dict(zip(self.indices, list(self.player_data_df[f"xmins_gw{t}"]))) for t in range(self.start_gameweek, self.end_t)}
-        self.estimated_costs_by_gw = {t: dict(zip(self.indices, list(self.player_data_df[f"ep_cost_gw{t}"]))) for t in range(self.start_gameweek, self.end_t)}
+        # Array-backed player data, rows follow player_data_df and columns the gameweeks start_gameweek -> end_t - 1.
+        # A shared pool may cover more gameweeks than this optimiser, in which case the relevant columns are selected.
+        if player_pool is None:
+            player_pool = PlayerPool.from_dataframe(self.player_data_df, range(self.start_gameweek, self.end_t), self.POSITIONS, self.TEAMS,
+                                                    costs="ep_cost_gw{t}", minutes="xmins_gw{t}", positions="position_gw{t}", teams="team_gw{t}")
+        elif not player_pool.index.equals(self.player_data_df.index):
+            raise ValueError("Error: The player pool rows must follow the player data DataFrame index!")
+        self.player_pool = player_pool
+        self.indices = player_pool.index
+        columns = player_pool.columns(range(self.start_gameweek, self.end_t))
+
+        self.position_groups = {pos: {t: self.indices[player_pool.position_group(pos, t)] for t in range(self.start_gameweek, self.end_t)} for pos in self.POSITIONS}
+        self.team_groups = {team: {t: self.indices[player_pool.team_group(team, t)] for t in range(self.start_gameweek, self.end_t)} for team in self.TEAMS}
+        self.pts_by_gw = player_pool.points[:, columns]
+        self.mins_played = player_pool.minutes[:, columns]
+        self.estimated_costs_by_gw = player_pool.costs[:, columns]
+        self.bench_weights = np.where(player_pool.positions[:, columns] == self.POSITIONS.index("GKP"), self.gkp_bench_weight, self.bench_weight)
 
     def objective_function(self) -> pulp.LpAffineExpression:
         """
@@ -76,10 +89,10 @@ class MILPActualsOptimiser:
         """
         # Objective function: Sum of expected points across all gameweeks.
         return pulp.lpSum([
-            (self.pts_by_gw[t][idx] * self.x_captain[idx][t]) +  # Captain's points
-            (self.pts_by_gw[t][idx] * (self.x_outfield[idx][t] + (self.gkp_bench_weight if self.player_data_df.at[idx, f"position_gw{t}"] == "GKP" else self.bench_weight) * self.x_bench[idx][t])) +
-            (self.pts_by_gw[t][idx] * 0.1 * self.x_vice_captain[idx][t])  # Vice-captain's points
-            for idx in self.indices for t in range(self.start_gameweek, self.end_t)
+            (self.pts_by_gw[i, j] * self.x_captain[idx][t]) +  # Captain's points
+            (self.pts_by_gw[i, j] * (self.x_outfield[idx][t] + self.bench_weights[i, j] * self.x_bench[idx][t])) +
+            (self.pts_by_gw[i, j] * 0.1 * self.x_vice_captain[idx][t])  # Vice-captain's points
+            for i, idx in enumerate(self.indices) for j, t in enumerate(range(self.start_gameweek, self.end_t))
         ])
 
     def initialise_optimisation(self) -> None:
@@ -119,11 +132,11 @@ class MILPActualsOptimiser:
             self.prob += pulp.lpSum([self.x_bench[idx][self.start_t] for idx in self.indices]) == 4, f"BenchPlayersConstraint_GW{self.start_t}"
 
         # Base constraints
-        for t in range(self.start_gameweek, self.end_t):
-            self.prob += pulp.lpSum([self.estimated_costs_by_gw[t][idx] * (self.x_outfield[idx][t] + self.x_bench[idx][t]) for idx in self.indices]) <= 100.0, f"BudgetConstraint_GW{t}"            
+        for j, t in enumerate(range(self.start_gameweek, self.end_t)):
+            self.prob += pulp.lpSum([self.estimated_costs_by_gw[i, j] * (self.x_outfield[idx][t] + self.x_bench[idx][t]) for i, idx in enumerate(self.indices)]) <= 100.0, f"BudgetConstraint_GW{t}"            
             
             # Update starting constraint to reflect min_played over multiple gameweeks 
-            #self.prob += pulp.lpSum([self.mins_played[t][idx] * (self.x_outfield[idx][t] + self.x_bench[idx][t]) for idx in self.indices]) >= 15 * 70.0, f"ProbabilityOfStartingConstraint_GW{t}"
+            #self.prob += pulp.lpSum([self.mins_played[i, j] * (self.x_outfield[idx][t] + self.x_bench[idx][t]) for i, idx in enumerate(self.indices)]) >= 15 * 70.0, f"ProbabilityOfStartingConstraint_GW{t}"
             self.prob += pulp.lpSum([self.x_outfield[idx][t] for idx in self.indices]) == 11, f"OutfieldPlayersConstraint_GW{t}"
             self.prob += pulp.lpSum([self.x_bench[idx][t] for idx in self.indices]) == 4, f"BenchPlayersConstraint_GW{t}"
 
@@ -154,7 +167,6 @@ class MILPActualsOptimiser:
             self.prob += pulp.lpSum([self.x_outfield[idx][t] + self.x_bench[idx][t] for idx in self.position_groups["DEF"][t]]) == 5, f"DefendersLineupHardConstraint_GW{t}"
             self.prob += pulp.lpSum([self.x_outfield[idx][t] + self.x_bench[idx][t] for idx in self.position_groups["MID"][t]]) == 5, f"MidfieldersLineupHardConstraint_GW{t}"
             self.prob += pulp.lpSum([self.x_outfield[idx][t] + self.x_bench[idx][t] for idx in self.position_groups["FWD"][t]]) == 3, f"ForwardsLineupHardConstraint_GW{t}"   
-            #self.prob += pulp.lpSum([self.estimated_costs_by_gw[t][idx] * self.x_bench[idx][t] for idx in self.position_groups["GKP"][t]]) <= 4.0, f"BenchGK_CostLT4M_GW{t}"
 
         # Transfer constraints: At most one transfer in and out per gameweek
         for t in range(self.start_t + 1, self.end_t):
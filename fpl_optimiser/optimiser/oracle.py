@@ -0,0 +1,238 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pulp
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, Optional
+
+from ..utils import YAMLFile, DATA_DIR
+from ..data import PlayerPool
+from .optimiser import MILPOptimiser
+from .optimiser_actuals import MILPActualsOptimiser
+from .workers import initialise_worker, worker_state
+
+def _solve_window(start_gameweek: int, horizon: int, plan: Optional[dict]) -> dict:
+    """Solves a single window with the worker's oracle (holding the shared season data), returning its checkpoint record."""
+    return worker_state().solve_window(start_gameweek, horizon, plan)
+
+
+class MILPHindsightOracle:
+    """
+    Class computing the hindsight-optimal score of every (start gameweek, horizon) window of a season with
+    MILPActualsOptimiser, returned as a start gameweek x horizon table.
+    The season data is loaded into a single PlayerPool shared by every window (and worker process). Each window is
+    solved over a pool pruned of dominated players, and windows are solved longest first, so that each is
+    warm-started from the best plan of an overlapping longer window (truncated, such a plan is always feasible).
+    Every finished window is appended to a checkpoint file, an interrupted run resumes without re-solving them.
+    """
+
+    MAX_TRANSFERS = 1  # Transfers per gameweek allowed by MILPActualsOptimiser.
+
+    def __init__(self,
+                 player_data_df: pd.DataFrame,
+                 gameweeks: Iterable[int],
+                 horizons: Iterable[int] = range(1, 6),
+                 processes: Optional[int] = None,
+                 gap_rel: float = 0.0,
+                 checkpoint_filepath: Optional[str] = None,
+                 config: Optional[YAMLFile] = None,
+                 **optimiser_kwargs) -> None:
+
+        # Player data follows the MILPActualsOptimiser format, with columns per gameweek for every gameweek given.
+        self.player_data_df = player_data_df
+        self.gameweeks = sorted(gameweeks)
+        self.horizons = sorted(horizons)
+        self.processes = processes
+        self.gap_rel = gap_rel
+        if checkpoint_filepath is None:
+            config = config or YAMLFile()
+            season_label = "_".join([year[-2:] for year in config.season.split("/")])
+            checkpoint_filepath = os.path.join(DATA_DIR, "actuals", f"FPL {season_label} season - hindsight oracle checkpoint.jsonl")
+        self.checkpoint_filepath = checkpoint_filepath
+        self.optimiser_kwargs = {"bench_weight": 0.5, "gkp_bench_weight": 0.1, **optimiser_kwargs}
+        self.settings = {"gap_rel": gap_rel, **self.optimiser_kwargs}  # Checkpoint records are only reused for the same settings.
+
+        if self.gameweeks != list(range(self.gameweeks[0], self.gameweeks[-1] + 1)):
+            raise ValueError("Error: Gameweeks must be consecutive!")
+
+        self.player_pool = PlayerPool.from_dataframe(player_data_df, self.gameweeks, MILPActualsOptimiser.POSITIONS, MILPActualsOptimiser.TEAMS,
+                                                     costs="ep_cost_gw{t}", minutes="xmins_gw{t}", positions="position_gw{t}", teams="team_gw{t}")
+        self.rows_by_id = pd.Series(np.arange(len(player_data_df)), index=player_data_df["id"].to_numpy())
+        self.results_df = None
+        self.table_df = None
+
+    def windows(self) -> list:
+        """Returns every (start gameweek, horizon) window within the season, longest first."""
+        return [(start, horizon) for horizon in reversed(self.horizons) for start in self.gameweeks if start + horizon - 1 <= self.gameweeks[-1]]
+
+    def read_checkpoint(self) -> dict:
+        """Reads the finished windows recorded with the current settings, keyed by (start gameweek, horizon)."""
+        if not os.path.exists(self.checkpoint_filepath):
+            return {}
+
+        records = []
+        with open(self.checkpoint_filepath, "r") as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # A record cut short by an interrupted run, the window is solved again.
+        return {(record["start_gameweek"], record["horizon"]): record for record in records if record["settings"] == self.settings}
+
+    def write_checkpoint(self, record: dict) -> None:
+        """Appends a finished window to the checkpoint file."""
+        os.makedirs(os.path.dirname(self.checkpoint_filepath) or ".", exist_ok=True)
+        with open(self.checkpoint_filepath, "a") as file:
+            file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def prune_pool(self, start_gameweek: int, horizon: int) -> np.ndarray:
+        """
+        Returns a mask of the players kept for a window. A player is dropped when, whatever the plan, an unselected
+        player of the same position who scores at least as many points and costs no more in every gameweek of the
+        window can take their place. Over L gameweeks a plan holds at most quota + L - 2 other players of a position
+        and fills at most 5 + L - 1 teams to the limit, so this holds when the player has at least quota + L - 1 such
+        dominating players outside of the other teams holding most of them.
+        """
+        columns = self.player_pool.columns(range(start_gameweek, start_gameweek + horizon))
+        points, costs = self.player_pool.points[:, columns], self.player_pool.costs[:, columns]
+        positions, teams = self.player_pool.positions[:, columns], self.player_pool.teams[:, columns]
+
+        # Only players with a fixed position and team over the window are compared.
+        stable = (positions == positions[:, :1]).all(axis=1) & (teams == teams[:, :1]).all(axis=1) & (positions[:, 0] >= 0) & (teams[:, 0] >= 0)
+        capped_teams = 15 // MILPOptimiser.MAX_PER_TEAM + (horizon - 1) * self.MAX_TRANSFERS
+        keep = np.ones(len(points), dtype=bool)
+        for code, position in enumerate(MILPActualsOptimiser.POSITIONS):
+            rows = np.flatnonzero(stable & (positions[:, 0] == code))
+            if not len(rows):
+                continue
+
+            # dominates[j, i] when j scores at least as much and costs no more every gameweek, ties broken by row order.
+            dominates = (points[rows, None, :] >= points[None, rows, :]).all(axis=2) & (costs[rows, None, :] <= costs[None, rows, :]).all(axis=2)
+            ties = dominates & dominates.T
+            dominates &= ~ties | (np.arange(len(rows))[:, None] < np.arange(len(rows))[None, :])
+
+            # Dominating players per team, excluding those in the teams that could be at the limit (other than their own).
+            team_codes = teams[rows, 0]
+            counts = dominates.T.astype(np.int32) @ (team_codes[:, None] == np.arange(len(MILPActualsOptimiser.TEAMS))[None, :]).astype(np.int32)
+            own_team = counts[np.arange(len(rows)), team_codes]
+            counts[np.arange(len(rows)), team_codes] = 0
+            usable = own_team + np.sort(counts, axis=1)[:, :-capped_teams].sum(axis=1)
+            keep[rows[usable >= MILPOptimiser.SQUAD_QUOTAS[position] + (horizon - 1) * self.MAX_TRANSFERS]] = False
+        return keep
+
+    def plan_points(self, plan: dict, start_gameweek: int, horizon: int) -> float:
+        """Returns the objective value of a plan over the gameweeks of a window, matching the optimiser objective."""
+        total = 0.0
+        for t in range(start_gameweek, start_gameweek + horizon):
+            points = self.player_pool.points[:, self.player_pool.column(t)]
+            bench = self.rows_by_id[plan["bench"][str(t)]].to_numpy()
+            bench_weights = np.where(self.player_pool.positions[bench, self.player_pool.column(t)] == 0, self.optimiser_kwargs["gkp_bench_weight"], self.optimiser_kwargs["bench_weight"])
+            total += points[self.rows_by_id[plan["outfield"][str(t)]].to_numpy()].sum() + (bench_weights * points[bench]).sum()
+            total += points[self.rows_by_id[plan["captain"][str(t)]]] + 0.1 * points[self.rows_by_id[plan["vice_captain"][str(t)]]]
+        return float(total)
+
+    def warm_start_plan(self, start_gameweek: int, horizon: int, records: dict) -> Optional[dict]:
+        """Returns the finished plan covering the window that scores the most over it, or None if there is none."""
+        covering = [record["plan"] for (start, length), record in records.items()
+                    if record["plan"] and start <= start_gameweek and start + length >= start_gameweek + horizon and (start, length) != (start_gameweek, horizon)]
+        return max(covering, key=lambda plan: self.plan_points(plan, start_gameweek, horizon), default=None)
+
+    def set_initial_values(self, optimiser: MILPActualsOptimiser, plan: dict) -> None:
+        """Sets the initial values of the optimiser's decision variables to the plan, over the optimiser's gameweeks."""
+        squads = {}
+        for t in range(optimiser.start_t, optimiser.end_t):
+            roles = {role: set(self.player_data_df.index[self.rows_by_id[np.atleast_1d(plan[role][str(t)])].to_numpy()])
+                     for role in ["outfield", "bench", "captain", "vice_captain"]}
+            squads[t] = roles["outfield"] | roles["bench"]
+            for idx in optimiser.indices:
+                optimiser.x_outfield[idx][t].setInitialValue(int(idx in roles["outfield"]))
+                optimiser.x_bench[idx][t].setInitialValue(int(idx in roles["bench"]))
+                optimiser.x_captain[idx][t].setInitialValue(int(idx in roles["captain"]))
+                optimiser.x_vice_captain[idx][t].setInitialValue(int(idx in roles["vice_captain"]))
+                if t > optimiser.start_t:
+                    optimiser.y_transfer_in[idx][t].setInitialValue(int(idx in squads[t] and idx not in squads[t - 1]))
+                    optimiser.y_transfer_out[idx][t].setInitialValue(int(idx in squads[t - 1] and idx not in squads[t]))
+            formation = self.player_data_df.loc[list(roles["outfield"]), f"position_gw{t}"].value_counts()
+            formation = [formation.get(pos, 0) for pos in ["DEF", "MID", "FWD"]]
+            for form_idx, form in optimiser.FORMATIONS_DICT.items():
+                optimiser.formation_vars[form_idx][t].setInitialValue(int(form == formation))
+
+    def solve_window(self, start_gameweek: int, horizon: int, plan: Optional[dict]) -> dict:
+        """Solves a window over its pruned player pool, warm-started from the given plan, and returns its checkpoint record."""
+        start_time = time.time()
+        keep = self.prune_pool(start_gameweek, horizon)
+        if plan is not None:
+            # Players of the warm start plan are always kept, so the plan remains feasible.
+            for role in ["outfield", "bench"]:
+                for t in range(start_gameweek, start_gameweek + horizon):
+                    keep[self.rows_by_id[plan[role][str(t)]].to_numpy()] = True
+        rows = np.flatnonzero(keep)
+
+        optimiser = MILPActualsOptimiser(self.player_data_df.iloc[rows], start_gameweek=start_gameweek, gameweeks=horizon,
+                                         validation=False, player_pool=self.player_pool.take(rows), **self.optimiser_kwargs)
+        optimiser.initialise_optimisation()
+        optimiser.add_constraints()
+        if plan is not None:
+            self.set_initial_values(optimiser, plan)
+        optimiser.prob.solve(pulp.PULP_CBC_CMD(msg=False, gapRel=self.gap_rel, warmStart=plan is not None))
+
+        solved = optimiser.prob.status == pulp.LpStatusOptimal
+        ids = lambda variables, t: [int(self.player_data_df.at[idx, "id"]) for idx in optimiser.indices if round(variables[idx][t].varValue or 0) == 1]
+        new_plan = {role: {str(t): ids(variables, t) for t in range(start_gameweek, start_gameweek + horizon)}
+                    for role, variables in [("outfield", optimiser.x_outfield), ("bench", optimiser.x_bench)]} if solved else None
+        if solved:
+            new_plan.update({role: {str(t): ids(variables, t)[0] for t in range(start_gameweek, start_gameweek + horizon)}
+                             for role, variables in [("captain", optimiser.x_captain), ("vice_captain", optimiser.x_vice_captain)]})
+
+        return {"start_gameweek": start_gameweek, "horizon": horizon, "objective": pulp.value(optimiser.prob.objective) if solved else None,
+                "status": pulp.LpStatus[optimiser.prob.status], "players": len(rows),
+                "warm_start": self.plan_points(plan, start_gameweek, horizon) if plan is not None else None,
+                "solve_time": time.time() - start_time, "settings": self.settings, "plan": new_plan}
+
+    def build_table(self) -> pd.DataFrame:
+        """
+        Computes the hindsight-optimal score of every window, resuming from the checkpoint file. Returns a start gameweek
+        x horizon table of objective values and sets a results DataFrame with one row per window.
+        """
+        start_time = time.time()
+        windows = self.windows()
+        records = self.read_checkpoint()
+        pending = [window for window in windows if window not in records]
+        print(f"Computing hindsight-optimal scores for {len(windows)} windows, {len(windows) - len(pending)} resumed from checkpoint...")
+
+        def record(result: dict) -> None:
+            records[(result["start_gameweek"], result["horizon"])] = result
+            self.write_checkpoint(result)
+
+        if self.processes == 1:
+            for window in pending:
+                record(self.solve_window(*window, self.warm_start_plan(*window, records)))
+        else:
+            # Windows are started once the longer windows covering them are finished, so they are warm-started from them.
+            window_set = set(windows)
+            parents = lambda start, horizon: [window for window in [(start, horizon + 1), (start - 1, horizon + 1)] if window in window_set]
+            shared_pool = self.player_pool.to_shared_memory()
+            pool, self.player_pool = self.player_pool, shared_pool
+            try:
+                with ProcessPoolExecutor(max_workers=self.processes, initializer=initialise_worker, initargs=(self,)) as executor:
+                    futures = {}
+                    while pending or futures:
+                        for window in [window for window in pending if all(parent in records for parent in parents(*window))]:
+                            futures[executor.submit(_solve_window, *window, self.warm_start_plan(*window, records))] = window
+                            pending.remove(window)
+                        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            del futures[future]
+                            record(future.result())
+            finally:
+                self.player_pool = pool
+                shared_pool.unlink()
+
+        self.results_df = pd.DataFrame([records[window] for window in windows]).drop(columns=["settings", "plan"])
+        self.results_df = self.results_df.sort_values(["start_gameweek", "horizon"], ignore_index=True)
+        self.table_df = self.results_df.pivot(index="start_gameweek", columns="horizon", values="objective")
+        print("Optimisation process complete!")
+        print(f"Time taken: {round(time.time() - start_time, 2)} seconds")
+        return self.table_df
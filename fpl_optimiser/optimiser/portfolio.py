@@ -0,0 +1,221 @@
+import os
+import json
+import inspect
+import queue
+import shutil
+import signal
+import tempfile
+import multiprocessing
+import pandas as pd
+import pulp
+import time
+from typing import Optional
+
+from ..utils import YAMLFile, DATA_DIR
+from .optimiser import MILPOptimiser
+
+def _race_configuration(name: str, config: dict, optimiser_kwargs: dict, deadline: float, tmp_dir: str, results: multiprocessing.Queue) -> None:
+    """
+    Builds and solves the model for a single portfolio configuration, putting its summary and results DataFrame (or
+    the raised exception) on the results queue. The worker leads a new process group, so that the racing process can
+    kill it together with its CBC subprocess.
+    """
+    if hasattr(os, "setsid"):
+        os.setsid()
+
+    start_time = time.time()
+    try:
+        config = dict(config)
+        options = config.pop("options", [])
+        optimiser = MILPOptimiser(**{**optimiser_kwargs, **config, "validation": False})
+        optimiser.build_problem()
+
+        solver = pulp.PULP_CBC_CMD(msg=False, timeLimit=max(deadline - time.time(), 1.0), options=options)
+        solver.tmpDir = tmp_dir  # Files left by a killed CBC are removed with the racing process' scratch directory.
+        optimiser.solve(solver)
+
+        status = optimiser.prob.status
+        incumbent = status == pulp.LpStatusOptimal and optimiser.prob.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible)
+        if incumbent:
+            optimiser.extract_results(validation=False)
+        summary = {"configuration": name, "status": pulp.LpStatus[status],
+                   "proven": optimiser.prob.sol_status == pulp.LpSolutionOptimal or status == pulp.LpStatusInfeasible,
+                   "objective": pulp.value(optimiser.prob.objective) if incumbent else None, "solve_time": time.time() - start_time}
+        results.put((summary, optimiser.results_df if incumbent else None))
+    except Exception as error:
+        results.put(({"configuration": name, "solve_time": time.time() - start_time}, error))
+
+
+class MILPPortfolioSolver:
+    """
+    Class racing several CBC configurations and formulations of the same MILPOptimiser model, one worker process each.
+    The first configuration to prove its solution optimal wins and the others are killed, otherwise every configuration
+    stops at the deadline and the best incumbent wins. Each race is appended to a log, from which configurations are
+    ranked by past wins, so that the configurations raced when there are more than processes follow the log.
+    """
+
+    # Configurations map a name to MILPOptimiser keyword arguments (e.g. the formulation) and a list of CBC options,
+    # ordered by solve time on a 3-gameweek GW23 forecast, which sets their rank until races are logged.
+    DEFAULT_PORTFOLIO = {
+        "decomposed_feas_off": {"decomposed": True, "options": ["feas off"]},
+        "decomposed": {"decomposed": True, "options": []},
+        "feas_off": {"options": ["feas off"]},
+        "default": {"options": []},
+        "cuts_off": {"options": ["cuts off"]},
+        "decomposed_cuts_off": {"decomposed": True, "options": ["cuts off"]},
+    }
+
+    def __init__(self,
+                 player_data_df: pd.DataFrame,
+                 start_gameweek: int,
+                 portfolio: Optional[dict] = None,
+                 processes: Optional[int] = None,
+                 time_limit: float = 60.0,
+                 grace_period: float = 10.0,
+                 log_filepath: Optional[str] = None,
+                 config: Optional[YAMLFile] = None,
+                 **optimiser_kwargs) -> None:
+
+        self.portfolio = portfolio or self.DEFAULT_PORTFOLIO
+        self.processes = processes or os.cpu_count() or 1
+        self.time_limit = time_limit
+        self.grace_period = grace_period  # Seconds past the deadline allowed for CBC to write its incumbent.
+        if log_filepath is None:
+            config = config or YAMLFile()
+            season_label = "_".join([year[-2:] for year in config.season.split("/")])
+            log_filepath = os.path.join(DATA_DIR, f"FPL {season_label} season - portfolio log.jsonl")
+        self.log_filepath = log_filepath
+        self.optimiser_kwargs = {"player_data_df": player_data_df, "start_gameweek": start_gameweek, **optimiser_kwargs}
+        self.results_df = None
+        self.summary_df = None
+        self.winner = None
+
+        unknown = {key for config in self.portfolio.values() for key in config} - {"options"} - set(inspect.signature(MILPOptimiser).parameters)
+        if unknown:
+            raise ValueError(f"Error: Unknown portfolio settings {sorted(unknown)}, expected CBC options or MILPOptimiser arguments!")
+
+    def read_log(self) -> pd.DataFrame:
+        """
+        Reads every logged race, one row per configuration raced, with a won column and a best column flagging the
+        configurations whose objective matched the best found in their race.
+        """
+        if not os.path.exists(self.log_filepath):
+            return pd.DataFrame(columns=["race", "start_gameweek", "gameweeks", "configuration", "status", "proven", "objective", "solve_time", "won", "best"])
+
+        with open(self.log_filepath, "r") as file:
+            races = [json.loads(line) for line in file if line.strip()]
+        log_df = pd.DataFrame([{"race": k, "start_gameweek": race["start_gameweek"], "gameweeks": race["gameweeks"], **summary,
+                                "won": summary["configuration"] == race["winner"]} for k, race in enumerate(races) for summary in race["configurations"]])
+        log_df["objective"] = log_df["objective"].astype(float)
+        log_df["best"] = log_df["objective"] >= log_df.groupby("race")["objective"].transform("max") - 1e-6
+        return log_df
+
+    def rank_configurations(self) -> pd.DataFrame:
+        """
+        Ranks the portfolio by logged wins, then by the share of races each configuration proved optimal, matched the
+        best objective found and found any team, then by mean solve time over its proven runs.
+        Configurations never raced keep their order last.
+        """
+        log_df = self.read_log()
+        ranking_df = pd.DataFrame({"configuration": list(self.portfolio), "order": range(len(self.portfolio))})
+        if not log_df.empty:
+            log_df["proven"] = log_df["proven"].astype(bool)
+            log_df["proven_solve_time"] = log_df["solve_time"].where(log_df["proven"])
+            log_df["found"] = log_df["objective"].notna()
+            stats_df = log_df.groupby("configuration").agg(races=("won", "size"), wins=("won", "sum"), proven_rate=("proven", "mean"),
+                                                           best_rate=("best", "mean"), found_rate=("found", "mean"),
+                                                           mean_solve_time=("proven_solve_time", "mean")).reset_index()
+            ranking_df = ranking_df.merge(stats_df, on="configuration", how="left")
+        else:
+            ranking_df = ranking_df.assign(races=float("nan"), wins=float("nan"), proven_rate=float("nan"), best_rate=float("nan"),
+                                           found_rate=float("nan"), mean_solve_time=float("nan"))
+        ranking_df[["races", "wins"]] = ranking_df[["races", "wins"]].fillna(0).astype(int)
+        ranking_df = ranking_df.sort_values(["wins", "proven_rate", "best_rate", "found_rate", "mean_solve_time", "order"],
+                                            ascending=[False, False, False, False, True, True], na_position="last")
+        return ranking_df.drop(columns="order").reset_index(drop=True)
+
+    @staticmethod
+    def kill(process: multiprocessing.Process) -> None:
+        """Kills a worker process together with its CBC subprocess."""
+        if process.is_alive():
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except (AttributeError, ProcessLookupError, PermissionError):
+                process.kill()  # The worker has not yet started its process group (or the platform has none).
+        process.join()
+
+    def write_log(self, summaries: list) -> None:
+        """Appends the latest race, given the summary of each configuration raced, to the log."""
+        os.makedirs(os.path.dirname(self.log_filepath) or ".", exist_ok=True)
+        race = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "start_gameweek": self.optimiser_kwargs["start_gameweek"],
+                "gameweeks": self.optimiser_kwargs.get("gameweeks", 3), "time_limit": self.time_limit, "winner": self.winner,
+                "configurations": summaries}
+        with open(self.log_filepath, "a") as file:
+            file.write(json.dumps(race) + "\n")
+
+    def calculate_optimal_team(self) -> pd.DataFrame:
+        """
+        Races the highest ranked configurations, one per process, returning the winning results DataFrame. Sets a summary
+        DataFrame holding each configuration's status, objective, solve time and whether it won, killed configurations
+        have a Killed status. Raises a RuntimeError when no configuration finds a team, re-raising any worker error.
+        """
+        start_time = time.time()
+        names = self.rank_configurations()["configuration"].tolist()[:self.processes]
+        print(f"Racing {len(names)} configurations ({', '.join(names)}) for a {self.optimiser_kwargs.get('gameweeks', 3)}-gameweek forecast, "
+              f"starting from GW: {self.optimiser_kwargs['start_gameweek']}...")
+
+        deadline = start_time + self.time_limit
+        context = multiprocessing.get_context()
+        results = context.Queue()
+        tmp_dir = tempfile.mkdtemp(prefix="fpl-portfolio-")
+        processes = {name: context.Process(target=_race_configuration, args=(name, self.portfolio[name], self.optimiser_kwargs, deadline, tmp_dir, results), daemon=True)
+                     for name in names}
+        summaries, outputs, error = {}, {}, None
+        try:
+            for process in processes.values():
+                process.start()
+
+            # Wait for the first proven answer, or every incumbent written once the deadline passes.
+            while len(summaries) < len(processes):
+                try:
+                    summary, output = results.get(timeout=max(deadline + self.grace_period - time.time(), 0.0))
+                except queue.Empty:
+                    break
+                summaries[summary["configuration"]] = summary
+                if isinstance(output, Exception):
+                    error = output
+                    break
+                outputs[summary["configuration"]] = output
+                if summary["proven"]:
+                    break
+        finally:
+            for process in processes.values():
+                self.kill(process)
+            results.close()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        if error is not None:
+            raise error
+
+        # The first proven answer wins, otherwise the best incumbent (the earliest reported on ties).
+        finished = [name for name in summaries if outputs[name] is not None or summaries[name]["proven"]]
+        proven = [name for name in finished if summaries[name]["proven"]]
+        incumbents = [name for name in finished if outputs[name] is not None]
+        self.winner = proven[0] if proven else max(incumbents, key=lambda name: summaries[name]["objective"]) if incumbents else None
+
+        records = [summaries.get(name, {"configuration": name, "status": "Killed", "proven": False, "objective": None, "solve_time": None}) for name in names]
+        self.summary_df = pd.DataFrame(records)
+        self.summary_df["won"] = self.summary_df["configuration"] == self.winner
+        self.write_log(records)
+
+        if self.winner is None:
+            raise RuntimeError("Error: No configuration found a team within the time limit!")
+        if outputs[self.winner] is None:
+            raise RuntimeError(f"Error: Optimisation is {summaries[self.winner]['status']}!")
+
+        self.results_df = outputs[self.winner]
+        print(f"Winning configuration: {self.winner} ({'proven optimal' if summaries[self.winner]['proven'] else 'best incumbent at the deadline'}, "
+              f"objective {round(summaries[self.winner]['objective'], 2)})")
+        print("Optimisation process complete!")
+        print(f"Time taken: {round(time.time() - start_time, 2)} seconds")
+        return self.results_df
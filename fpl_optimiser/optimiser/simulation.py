@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+import time
+from typing import Optional, Union
+
+from .lineup import MIN_STARTERS, MAX_STARTERS, STARTERS
+from .optimiser import MILPOptimiser
+
+class SquadSimulator:
+    """
+    Class evaluating squads from optimiser results against sampled gameweek outcomes.
+    Each player appears with probability (1 - prob_injury) * min(xMins / appearance_minutes, 1) and, when appearing,
+    scores the appearance points (or their conditional expectation if lower) plus a gamma-Poisson remainder, so that
+    the expected points match xPts. The FPL auto-substitution rules (bench order, formation validity and vice-captain
+    takeover) and the bench boost and triple captain chips are applied to every draw at once.
+    Outcomes are drawn once per player and gameweek and shared by every squad in a call, so differences between
+    candidate squads reflect the squads rather than sampling noise.
+    """
+
+    def __init__(self,
+                 draws: int = 100_000,
+                 appearance_minutes: float = 90.0,
+                 appearance_points: float = 2.0,
+                 dispersion: float = 1.0,
+                 chunk_size: int = 10_000,
+                 seed: Optional[int] = None) -> None:
+
+        self.draws = draws
+        self.appearance_minutes = appearance_minutes  # Expected minutes at or above which a fit player always appears.
+        self.appearance_points = appearance_points
+        self.dispersion = dispersion  # Gamma shape of the points remainder, lower values give heavier tails (hauls).
+        self.chunk_size = chunk_size  # Draws simulated at a time, bounding memory use.
+        self.seed = seed
+        self.points = None
+        self.summary_df = None
+
+    def arrange_squads(self, squads: list, gameweeks: list) -> dict:
+        """
+        Arranges each squad's gameweeks into 15 slots: the starting XI ordered by position, the bench goalkeeper, then
+        the outfield bench in order of descending xPts (the substitution priority). Returns the slot arrays of shape
+        (gameweeks, squads, 15) along with the expected points, minutes and injury probability of every distinct
+        player and gameweek, which the slots index into.
+        """
+        keys, players, shape = {}, [], (len(gameweeks), len(squads))
+        slots, positions = np.zeros(shape + (15,), dtype=np.int64), np.zeros(shape + (15,), dtype=np.int64)
+        captains, vice_captains = np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.int64)
+        multipliers, bench_boost = np.full(shape, 2.0), np.zeros(shape, dtype=bool)
+        position_codes = {pos: code for code, pos in enumerate(MILPOptimiser.POSITIONS)}
+
+        for s, results_df in enumerate(squads):
+            for g, t in enumerate(gameweeks):
+                squad_df = results_df[results_df["gameweek"] == t].assign(pos_code=lambda df: df["position"].map(position_codes))
+                if len(squad_df) != 15 or (squad_df["position_type"] == "Outfield").sum() != STARTERS:
+                    raise ValueError(f"Error: Squad {s} must have 15 players with 11 starters in GW{t}!")
+
+                starters_df = squad_df[squad_df["position_type"] == "Outfield"].sort_values("pos_code", kind="stable")
+                bench_df = squad_df[squad_df["position_type"] == "Bench"]
+                bench_df = pd.concat([bench_df[bench_df["pos_code"] == 0], bench_df[bench_df["pos_code"] != 0].sort_values("xPts", ascending=False, kind="stable")])
+                squad_df = pd.concat([starters_df, bench_df])
+
+                for slot, row in enumerate(squad_df.itertuples(index=False)):
+                    if (row.id, t) not in keys:
+                        keys[(row.id, t)] = len(players)
+                        players.append((row.xPts, row.xMins, row.prob_injury))
+                    slots[g, s, slot] = keys[(row.id, t)]
+                positions[g, s] = squad_df["pos_code"].to_numpy()
+                captains[g, s] = np.flatnonzero(squad_df["captain"].to_numpy())[0]
+                vice_captains[g, s] = np.flatnonzero(squad_df["vice_captain"].to_numpy())[0]
+                chip = squad_df["chip"].iloc[0] if "chip" in squad_df.columns else None
+                multipliers[g, s] = 3.0 if chip == "triple_captain" else 2.0
+                bench_boost[g, s] = chip == "bench_boost"
+
+        expected_points, minutes, prob_injury = np.nan_to_num(np.array(players, dtype=float)).T
+        return {"slots": slots, "positions": positions, "captains": captains, "vice_captains": vice_captains,
+                "multipliers": multipliers, "bench_boost": bench_boost,
+                "expected_points": expected_points, "minutes": minutes, "prob_injury": prob_injury}
+
+    def sample_players(self, expected_points: np.ndarray, minutes: np.ndarray, prob_injury: np.ndarray, draws: int, rng: np.random.Generator) -> tuple:
+        """Samples whether each player appears and the points they score, returning arrays of shape (players, draws)."""
+        prob_appear = (1 - prob_injury) * np.clip(minutes / self.appearance_minutes, 0, 1)
+        conditional_points = np.where(prob_appear > 0, np.maximum(expected_points, 0) / np.maximum(prob_appear, 1e-12), 0)
+        base_points = np.minimum(conditional_points, self.appearance_points)
+        remainder = (conditional_points - base_points)[:, None]
+
+        played = rng.random((len(prob_appear), draws)) < prob_appear[:, None]
+        rates = rng.gamma(self.dispersion, remainder / self.dispersion, size=played.shape)
+        points = ((base_points[:, None] + rng.poisson(rates)) * played).astype(np.float32)
+        return played, points
+
+    def score_gameweek(self, played: np.ndarray, points: np.ndarray, positions: np.ndarray, captains: np.ndarray,
+                       vice_captains: np.ndarray, multipliers: np.ndarray, bench_boost: np.ndarray) -> tuple:
+        """
+        Scores one gameweek for every squad and draw given slot-major arrays of shape (15, squads, draws), applying
+        auto-substitutions and captaincy. Returns the total points and the points scored by bench players, both of
+        shape (squads, draws).
+        """
+        rows = np.arange(played.shape[1])
+        substitutable = ~bench_boost[:, None]
+
+        # Starters who do not appear score nothing, the bench counts only with bench boost or when coming on.
+        came_on = np.zeros((15 - STARTERS,) + played.shape[1:], dtype=bool)
+        came_on[:, bench_boost] = True
+
+        # A goalkeeper who does not appear can only be replaced by the bench goalkeeper.
+        came_on[0] |= ~played[0] & played[STARTERS] & substitutable
+
+        # Each outfield starter who does not appear is replaced by the first outfield substitute who appeared, has not
+        # already come on and keeps the formation valid. Only draws where a substitution is possible are visited, as
+        # flat vectors of (squad, draw) pairs with formation counts tracked per pair as substitutions happen.
+        active = substitutable & ~played[1:STARTERS].all(axis=0) & played[STARTERS + 1:].any(axis=0)
+        squad_idx, draw_idx = np.nonzero(active)
+        pair_played, pair_positions = played[:, squad_idx, draw_idx], positions.T[:, squad_idx]
+        squad_counts = (positions[:, :STARTERS, None] == np.arange(len(MIN_STARTERS))).sum(axis=1).T.astype(np.int8)
+        counts = squad_counts[:, squad_idx]
+        used = np.zeros((15 - STARTERS - 1, len(squad_idx)), dtype=bool)
+        for s in range(1, STARTERS):
+            missing = np.flatnonzero(~pair_played[s])
+            position_out = pair_positions[s, missing]
+            can_leave = counts[position_out, missing] > MIN_STARTERS[position_out]  # Unchanged until the starter is replaced.
+            replaced = np.zeros(len(missing), dtype=bool)
+            for j, b in enumerate(range(STARTERS + 1, 15)):
+                position_in = pair_positions[b, missing]
+                valid = (position_out == position_in) | (can_leave & (counts[position_in, missing] < MAX_STARTERS[position_in]))
+                substitution = ~replaced & pair_played[b, missing] & ~used[j, missing] & valid
+                replaced |= substitution
+                substituted = missing[substitution]
+                used[j, substituted] = True
+                counts[position_out[substitution], substituted] -= 1
+                counts[position_in[substitution], substituted] += 1
+        came_on[1:, squad_idx, draw_idx] |= used
+
+        # The vice-captain takes the armband (including a triple captain) when the captain does not appear.
+        captain_points = np.where(played[captains, rows], points[captains, rows], np.where(played[vice_captains, rows], points[vice_captains, rows], 0))
+        bench_points = np.where(came_on, points[STARTERS:], 0).sum(axis=0)
+        total = points[:STARTERS].sum(axis=0) + bench_points + (multipliers - 1)[:, None] * captain_points
+        return total, bench_points
+
+    def simulate(self, squads: list, gameweeks: list) -> tuple:
+        """
+        Simulates the total points of each squad over the given forecast gameweeks. Returns the total and bench points
+        of shape (squads, draws), along with the arranged squads.
+        """
+        gameweeks = list(gameweeks)
+        arranged = self.arrange_squads(squads, gameweeks)
+        rng = np.random.default_rng(self.seed)
+        totals, bench = np.zeros((len(squads), self.draws), dtype=np.float32), np.zeros((len(squads), self.draws), dtype=np.float32)
+
+        for start in range(0, self.draws, self.chunk_size):
+            draws = min(self.chunk_size, self.draws - start)
+            played, points = self.sample_players(arranged["expected_points"], arranged["minutes"], arranged["prob_injury"], draws, rng)
+            for g in range(len(gameweeks)):
+                slots = arranged["slots"][g].T
+                total, bench_points = self.score_gameweek(played[slots], points[slots], arranged["positions"][g], arranged["captains"][g],
+                                                          arranged["vice_captains"][g], arranged["multipliers"][g], arranged["bench_boost"][g])
+                totals[:, start:start + draws] += total
+                bench[:, start:start + draws] += bench_points
+        return totals, bench, arranged
+
+    def evaluate(self, squads: Union[pd.DataFrame, list, dict], gameweeks: list) -> pd.DataFrame:
+        """
+        Evaluates one squad (a results DataFrame) or many candidate squads (a list or dict of results DataFrames) in a
+        single batched simulation over the given forecast gameweeks. Results of an existing team also hold the played
+        gameweek before start_gameweek, whose xPts repeat the next gameweek's, so the gameweeks are not inferred. Returns a summary DataFrame, one row per squad, comparing the deterministic expected
+        points with the simulated points distribution, the mean points from the bench and the probability of each
+        squad scoring the most. The simulated total points are stored with shape (squads, draws).
+        """
+        start_time = time.time()
+        if isinstance(squads, pd.DataFrame):
+            squads = [squads]
+        labels, squads = (list(squads.keys()), list(squads.values())) if isinstance(squads, dict) else (list(range(len(squads))), list(squads))
+        if not squads:
+            raise ValueError("Error: At least one squad must be provided!")
+        if not len(gameweeks):
+            raise ValueError("Error: At least one gameweek must be provided!")
+
+        totals, bench, arranged = self.simulate(squads, gameweeks)
+        self.points = totals
+
+        # Expected points as modelled by the optimiser: starters (every player with bench boost) plus the captain bonus.
+        expected_points = arranged["expected_points"][arranged["slots"]]
+        counted = np.arange(15) < STARTERS
+        counted = counted | arranged["bench_boost"][:, :, None]
+        captain_points = np.take_along_axis(expected_points, arranged["captains"][:, :, None], axis=2)[:, :, 0]
+        xpts = (np.where(counted, expected_points, 0).sum(axis=2) + (arranged["multipliers"] - 1) * captain_points).sum(axis=0)
+
+        percentiles = np.percentile(totals, [5, 25, 50, 75, 95], axis=1)
+        best = totals == totals.max(axis=0)
+        self.summary_df = pd.DataFrame({"squad": labels, "xPts": xpts, "mean": totals.mean(axis=1), "std": totals.std(axis=1),
+                                        "p5": percentiles[0], "p25": percentiles[1], "median": percentiles[2],
+                                        "p75": percentiles[3], "p95": percentiles[4], "bench_pts": bench.mean(axis=1),
+                                        "prob_best": (best / best.sum(axis=0)).mean(axis=1)})
+        print(f"Simulated {self.draws} draws of {len(squads)} squad(s) in {round(time.time() - start_time, 2)} seconds:\n{self.summary_df}")
+        return self.summary_df
@@ -0,0 +1,13 @@
+# State shared by the solves within a worker process, e.g. a model template built once and copied to each worker.
+_state = None
+
+
+def initialise_worker(state) -> None:
+    """Stores the shared state for the worker process, as the initializer of a process pool (or directly when solving in-process)."""
+    global _state
+    _state = state
+
+
+def worker_state():
+    """Returns the shared state stored for the worker process."""
+    return _state
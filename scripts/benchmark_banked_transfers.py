@@ -0,0 +1,93 @@
+"""
+Benchmarks MILPOptimiser solve times with banked transfers against the single transfer per gameweek model.
+
+Each start gameweek is solved for the existing team held before it (or a new squad with --new-squad), once per
+horizon, formulation, model and CBC seed. Forecasts cover three gameweeks, so longer horizons append the forecasts
+made three and six gameweeks later, which must be on disk. Banked transfers are solved as calulate_optimal_team
+solves them, cut off at the held squad. Prints every run, then the median solve time of each model and their ratio.
+
+Usage, from the repository root:
+    python scripts/benchmark_banked_transfers.py --start-gameweeks 21 23 --gameweeks 3
+    python scripts/benchmark_banked_transfers.py --start-gameweeks 20 --gameweeks 3 4 5 6 --new-squad --decomposed
+"""
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+import pulp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fpl_optimiser import FplAPIData, FplXPtsForecastData, MILPOptimiser
+
+
+def load_gameweek_data(start_gameweek: int, gameweeks: int) -> pd.DataFrame:
+    """Merges the official API data of start_gameweek with the xPts forecasts covering the horizon."""
+    player_data_df = FplAPIData().read_gw_player_data(gameweek=start_gameweek)
+    gw_df = player_data_df[~player_data_df["position"].isna()]
+    for gameweek in range(start_gameweek, start_gameweek + gameweeks, 3):
+        xpts_df = FplXPtsForecastData().get_gw_player_forecast_data(gameweek=gameweek, save_to_disk=False)
+        if gameweek == start_gameweek:
+            gw_df = pd.merge(gw_df, xpts_df.drop(columns=["position", "cost"]), how="left", on="name")
+        else:
+            columns = [col for col in xpts_df.columns if col.startswith("ep_gw") and col not in gw_df.columns]
+            gw_df = pd.merge(gw_df, xpts_df[["name"] + columns].drop_duplicates("name"), how="left", on="name")
+            gw_df[columns] = gw_df[columns].fillna(0)
+    return gw_df.reset_index(drop=True)
+
+
+def benchmark(gw_df: pd.DataFrame, start_gameweek: int, gameweeks: int, banked_transfers: bool, seed: int, args: argparse.Namespace) -> dict:
+    """Builds and solves one model, returning its status, objective, solve time and transfers made each gameweek."""
+    optimiser = MILPOptimiser(gw_df, start_gameweek=start_gameweek, gameweeks=gameweeks, use_existing_team=not args.new_squad,
+                              decomposed=args.decomposed, banked_transfers=banked_transfers, validation=False)
+    optimiser.build_problem()
+    start_time = time.time()
+    solver = pulp.PULP_CBC_CMD(msg=False, timeLimit=args.time_limit, options=[f"randomCbcSeed {seed}"])
+    if banked_transfers:
+        optimiser.solve_from_held_squad(solver)  # As calulate_optimal_team solves banked transfers.
+    else:
+        optimiser.solve(solver)
+    solve_time = time.time() - start_time
+
+    transfers = None
+    if optimiser.prob.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+        optimiser.extract_results(validation=False)
+        squads = optimiser.results_df.groupby("gameweek")["id"].apply(set)
+        transfers = [len(squads[t] - squads[t - 1]) for t in squads.index[1:]]
+    return {"start_gameweek": start_gameweek, "gameweeks": gameweeks, "formulation": "decomposed" if args.decomposed else "default",
+            "model": "banked" if banked_transfers else "single", "seed": seed, "status": pulp.LpStatus[optimiser.prob.status],
+            "proven": optimiser.prob.sol_status == pulp.LpSolutionOptimal, "objective": pulp.value(optimiser.prob.objective),
+            "solve_time": round(solve_time, 2), "transfers": transfers}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--start-gameweeks", type=int, nargs="+", default=[21, 23])
+    parser.add_argument("--gameweeks", type=int, nargs="+", default=[3])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3], help="CBC random seeds, one run per seed.")
+    parser.add_argument("--time-limit", type=float, default=600.0)
+    parser.add_argument("--decomposed", action="store_true", help="Benchmark the decomposed formulation.")
+    parser.add_argument("--new-squad", action="store_true", help="Select a new squad instead of the existing team.")
+    parser.add_argument("--output", help="Optional .csv filepath for the runs.")
+    args = parser.parse_args()
+
+    runs = []
+    for start_gameweek in args.start_gameweeks:
+        gw_df = load_gameweek_data(start_gameweek, max(args.gameweeks))
+        for gameweeks in args.gameweeks:
+            for seed in args.seeds:
+                for banked_transfers in (False, True):
+                    runs.append(benchmark(gw_df, start_gameweek, gameweeks, banked_transfers, seed, args))
+                    print(runs[-1], flush=True)
+
+    runs_df = pd.DataFrame(runs)
+    if args.output:
+        runs_df.to_csv(args.output, index=False)
+    summary_df = runs_df.pivot_table(index=["start_gameweek", "gameweeks", "formulation"], columns="model", values="solve_time", aggfunc="median")
+    summary_df["ratio"] = summary_df["banked"] / summary_df["single"]
+    print("\nMedian solve time (seconds):")
+    print(summary_df.round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()